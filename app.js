@@ -706,6 +706,61 @@ document.addEventListener('DOMContentLoaded', async () => {
         return matching.concat(global);
     }
 
+    async function fetchScenarioSideTable(fileName, key) {
+        const response = await fetch(fileName);
+        if (!response.ok) throw new Error(`${fileName} load failed (${response.status})`);
+        const data = await response.json();
+        return (data && typeof data[key] === 'object' && data[key]) ? data[key] : {};
+    }
+
+    function isProfileReference(value) {
+        return !!value && typeof value === 'object' && !Array.isArray(value)
+            && Object.keys(value).length === 1 && typeof value.$profile === 'string';
+    }
+
+    function isMessageReference(value) {
+        return !!value && typeof value === 'object' && !Array.isArray(value)
+            && Object.keys(value).length === 1 && typeof value.$message === 'string';
+    }
+
+    // scenarios.json can keep per-company fields and repeated system messages in separate
+    // content-hashed files; swap the {"$profile"} / {"$message"} placeholders back for the real values.
+    async function expandScenarioReferences(data) {
+        if (!data || typeof data !== 'object' || Array.isArray(data) || !data.scenarios) return data;
+        const list = Array.isArray(data.scenarios) ? data.scenarios : Object.values(data.scenarios);
+        // A file rewritten without its companyProfiles / messageTable pointers still
+        // holds placeholders; refuse to show them as data.
+        const profiles = typeof data.companyProfiles === 'string'
+            ? await fetchScenarioSideTable(data.companyProfiles, 'companies')
+            : null;
+        const messages = typeof data.messageTable === 'string'
+            ? await fetchScenarioSideTable(data.messageTable, 'messages')
+            : null;
+        list.forEach(scenario => {
+            if (!scenario || typeof scenario !== 'object') return;
+            Object.keys(scenario).forEach(field => {
+                if (!isProfileReference(scenario[field])) return;
+                const profile = profiles && profiles[scenario[field].$profile];
+                if (!profile || !Object.prototype.hasOwnProperty.call(profile, field)) {
+                    throw new Error(`Company profile ${scenario[field].$profile} has no ${field}`);
+                }
+                scenario[field] = profile[field];
+            });
+        });
+        list.forEach(scenario => {
+            if (!scenario || !Array.isArray(scenario.conversation)) return;
+            scenario.conversation.forEach(message => {
+                if (!message || !isMessageReference(message.message_text)) return;
+                const text = messages && messages[message.message_text.$message];
+                if (typeof text !== 'string') {
+                    throw new Error(`Message body ${message.message_text.$message} is missing`);
+                }
+                message.message_text = text;
+            });
+        });
+        return data;
+    }
+
     
     // Load scenarios data
     async function loadScenariosData() {
@@ -728,7 +783,7 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
         try {
             const response = await fetch('scenarios.json');
-            const data = await response.json();
+            const data = await expandScenarioReferences(await response.json());
 
             const scenarios = coerceScenariosPayloadToMap(data);
             return scenarios;
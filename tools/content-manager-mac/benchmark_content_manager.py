@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import content_manager_mac as cm
+
+BASE_SCENARIOS = 662
+BASE_SCENARIO_COMPANIES = 163
+BASE_TEMPLATES = 42500
+BASE_TEMPLATE_COMPANIES = 1370
+CSV_COLUMNS = [
+    "SEND_ID",
+    "COMPANY_NAME",
+    "COMPANY_WEBSITE",
+    "PERSONA",
+    "MESSAGE_TONE",
+    "CONVERSATION_JSON",
+    "LAST_5_PRODUCTS",
+    "ORDERS",
+    "COMPANY_NOTES",
+    "ESCALATION_TOPICS",
+    "BLOCKLISTED_WORDS",
+]
+WORDS = (
+    "order shipping return size code discount free sweater dress jeans today week link "
+    "store credit member exclusive restock available track package refund exchange color "
+    "surprise treat yourself checkout cart favorite style new arrivals sale ends tonight"
+).split()
+NOTE_HEADINGS = ["# Send to CS", "# Tone", "# Templates", "# Promo & Exclusions", "# Escalate", "# Do's & Don'ts"]
+
+
+def sentence(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def company_name(index):
+    return f"Brand {index:04d}"
+
+
+def build_company_notes(rng):
+    lines = []
+    for heading in rng.sample(NOTE_HEADINGS, 4):
+        lines.append(heading)
+        lines.extend(f"- {sentence(rng, 6, 18)}" for _ in range(rng.randint(1, 3)))
+    return "\n".join(lines)
+
+
+def build_conversation(rng):
+    messages = []
+    for i in range(rng.randint(4, 60)):
+        kind = rng.choice(["system", "system", "customer", "agent"])
+        messages.append({
+            "message_media": [],
+            "message_text": sentence(rng, 8, 40),
+            "message_type": kind,
+            "date_time": f"2026-01-{1 + i % 28:02d} 12:{i % 60:02d}:00.000",
+        })
+    return messages
+
+
+def build_orders(rng):
+    orders = []
+    for n in range(rng.choice([0, 0, 1, 2])):
+        products = [
+            {"product_name": sentence(rng, 2, 4), "product_price": f"{rng.uniform(5, 120):.2f}", "product_link": f"https://shop.example/p/{rng.randint(1, 10**6)}"}
+            for _ in range(rng.randint(1, 4))
+        ]
+        orders.append({
+            "order_number": str(rng.randint(10**5, 10**6)),
+            "order_date": "2026-01-10",
+            "order_status_url": f"https://shop.example/o/{n}",
+            "total": f"{rng.uniform(10, 300):.2f}",
+            "products": products,
+        })
+    return orders
+
+
+def build_products(rng):
+    return [
+        {"product_name": sentence(rng, 2, 5), "product_link": f"https://shop.example/p/{rng.randint(1, 10**6)}", "view_date": f"{rng.randint(1, 9)} days ago"}
+        for _ in range(rng.randint(0, 5))
+    ]
+
+
+def generate_scenario_csv(path, count, seed=1):
+    rng = random.Random(seed)
+    companies = max(1, count * BASE_SCENARIO_COMPANIES // BASE_SCENARIOS)
+    notes = {}
+    with path.open("w", encoding="utf-8", newline="") as fh:
+        writer = csv.DictWriter(fh, CSV_COLUMNS)
+        writer.writeheader()
+        for i in range(count):
+            company = rng.randrange(companies)
+            if company not in notes:
+                notes[company] = build_company_notes(rng)
+            writer.writerow({
+                "SEND_ID": f"send-{i:08d}",
+                "COMPANY_NAME": company_name(company),
+                "COMPANY_WEBSITE": f"https://brand{company}.example",
+                "PERSONA": rng.choice(["Alexa", "Sam", "Jordan"]),
+                "MESSAGE_TONE": rng.choice(["Polished", "Friendly", "Playful"]),
+                "CONVERSATION_JSON": json.dumps(build_conversation(rng)),
+                "LAST_5_PRODUCTS": json.dumps(build_products(rng)),
+                "ORDERS": json.dumps(build_orders(rng)),
+                "COMPANY_NOTES": notes[company],
+                "ESCALATION_TOPICS": "['refund', 'legal threat', 'chargeback']",
+                "BLOCKLISTED_WORDS": '["cheap", "guarantee"]',
+            })
+
+
+def iter_templates(count, seed=2):
+    rng = random.Random(seed)
+    companies = max(1, count * BASE_TEMPLATE_COMPANIES // BASE_TEMPLATES)
+    for i in range(count):
+        tpl = {"content": sentence(rng, 15, 55), "name": sentence(rng, 2, 6), "id": f"tpl-{i:08d}"}
+        if rng.random() < 0.42:
+            tpl["shortcut"] = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(3))
+        if rng.random() > 0.004:
+            tpl["companyName"] = company_name(rng.randrange(companies))
+        yield tpl
+
+
+def generate_templates_json(path, count, seed=2):
+    with path.open("w", encoding="utf-8") as fh:
+        fh.write('{"templates": [')
+        for i, tpl in enumerate(iter_templates(count, seed)):
+            fh.write(("\n" if i == 0 else ",\n") + json.dumps(tpl))
+        fh.write("\n]}\n")
+
+
+def drain(items):
+    return sum(1 for _ in items)
+
+
+def iter_cached_conversions(csv_path):
+    cache = cm.CompanyFieldCache()
+    for chunk in cm.iter_chunks(cm.iter_csv_rows(csv_path), cm.IMPORT_CHUNK_SIZE):
+        yield from cm.convert_csv_rows(chunk, cache=cache)
+
+
+def reset_scenarios(folder):
+    cm.clear_scenarios_output(folder / "scenarios.json")
+
+
+def reset_templates(folder):
+    cm.clear_templates_output(folder / "templates.json")
+
+
+def measure(fn, trace_memory):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_scale(scale, workdir, trace_memory, workers):
+    # Every stage re-reads its input from disk and drops its output, so peak
+    # memory is the stage's own and not the sum of everything before it.
+    scenario_count = BASE_SCENARIOS * scale
+    template_count = BASE_TEMPLATES * scale
+    folder = workdir / f"{scale}x"
+    folder.mkdir()
+    csv_path = folder / "scenarios-source.csv"
+    batch_path = folder / "scenarios-batch.csv"
+    templates_src = folder / "templates-source.json"
+    generate_scenario_csv(csv_path, scenario_count)
+    generate_scenario_csv(batch_path, 5)
+    generate_templates_json(templates_src, template_count)
+    scenarios_path = folder / "scenarios.json"
+    templates_path = folder / "templates.json"
+    results = []
+
+    def record(stage, items, fn, reset=None):
+        if reset is not None:
+            run = lambda: (reset(), fn())[1]
+        else:
+            run = fn
+        result, elapsed, peak = measure(run, trace_memory)
+        row = {
+            "scale": scale,
+            "stage": stage,
+            "items": items,
+            "seconds": elapsed,
+            "itemsPerSecond": items / elapsed if elapsed else None,
+            "peakBytes": peak,
+        }
+        if isinstance(result, dict) and "metrics" in result:
+            row["counters"] = dict(result["metrics"].counters)
+        results.append(row)
+
+    record("convert_csv_row_to_scenario", scenario_count, lambda: drain(cm.convert_csv_row_to_scenario(row) for row in cm.iter_csv_rows(csv_path)))
+    record("convert_csv_row_to_scenario (cached)", scenario_count, lambda: drain(iter_cached_conversions(csv_path)))
+    record("convert + normalize_scenario_record_for_storage", scenario_count, lambda: drain(cm.normalize_scenario_record_for_storage(item) for item in iter_cached_conversions(csv_path)))
+
+    record(f"import_scenarios_file csv -> json (workers={workers})", scenario_count, lambda: cm.import_scenarios_file(csv_path, scenarios_path, workers=workers), lambda: reset_scenarios(folder))
+    record("import_scenarios_file 5-row batch -> json", 5, lambda: cm.import_scenarios_file(batch_path, scenarios_path, workers=1))
+    record(f"import_scenarios_file csv -> jsonl (workers={workers})", scenario_count, lambda: cm.import_scenarios_file(csv_path, scenarios_path, workers=workers, jsonl=True), lambda: reset_scenarios(folder))
+    record("import_scenarios_file 5-row batch -> jsonl", 5, lambda: cm.import_scenarios_file(batch_path, scenarios_path, workers=1, jsonl=True))
+
+    stored = cm.load_flat_scenarios(scenarios_path)
+    batch = stored[:5]
+    record("merge_scenarios_by_id (5-row batch)", len(batch), lambda: cm.merge_scenarios_by_id(stored, batch))
+    record("merge_scenarios_by_id incremental (5-row batch)", len(batch), lambda: cm.merge_scenarios_by_id(stored, batch, incremental=True))
+    record("write_json_object scenarios", len(stored), lambda: cm.write_json_object(folder / "scenarios-copy.json", {"scenarios": stored}))
+    del stored, batch
+
+    record("import_templates_file", template_count, lambda: cm.import_templates_file(templates_src, templates_path), lambda: reset_templates(folder))
+    record("import_templates_file (--no-index)", template_count, lambda: cm.import_templates_file(templates_src, templates_path, index=False), lambda: reset_templates(folder))
+    record("import_templates_file (--search-index)", template_count, lambda: cm.import_templates_file(templates_src, templates_path, search_index=True), lambda: reset_templates(folder))
+    templates = cm.convert_template_container_to_list(cm.read_json_object(templates_src))
+    record("dedupe_template_payload", template_count, lambda: cm.dedupe_template_payload({"templates": templates}))
+    record("build_shortcut_table", template_count, lambda: cm.build_shortcut_table(templates))
+    record("write_template_search_index", template_count, lambda: cm.write_template_search_index(templates_path, templates))
+    if cm.fts5_available():
+        record("write_template_search_db", template_count, lambda: cm.write_template_search_db(templates_path, templates))
+    record("write_json_object templates", template_count, lambda: cm.write_json_object(templates_path, {"templates": templates}))
+    record("write_json_object templates (compact)", template_count, lambda: cm.write_json_object(templates_path, {"templates": templates}, compact=True))
+    del templates
+    record("read_json_object templates", template_count, lambda: cm.read_json_object(templates_path))
+    return results
+
+
+def compare_json_backends(folder, workdir, trace_memory):
+    results = []
+    for backend in cm.JSON_BACKENDS:
+        try:
+            cm.set_json_backend(backend)
+        except ValueError:
+            continue
+        for name in ("scenarios.json", "templates.json"):
+            source = folder / name
+            if not source.exists():
+                continue
+            target = workdir / name
+            value, elapsed, peak = measure(lambda: cm.read_json_object(source), trace_memory)
+            items = cm.get_scenario_count(value) if name == "scenarios.json" else cm.get_template_count(value)
+            stages = [
+                (f"[{backend}] read {name}", elapsed, peak),
+                (f"[{backend}] write {name}",) + measure(lambda: cm.write_json_object(target, value), trace_memory)[1:],
+                (f"[{backend}] write {name} (compact)",) + measure(lambda: cm.write_json_object(target, value, compact=True), trace_memory)[1:],
+            ]
+            for stage, seconds, peak_bytes in stages:
+                results.append({
+                    "scale": 1,
+                    "stage": stage,
+                    "items": items,
+                    "seconds": seconds,
+                    "itemsPerSecond": items / seconds if seconds else None,
+                    "peakBytes": peak_bytes,
+                })
+    return results
+
+
+def format_row(row):
+    rate = f"{row['itemsPerSecond']:>12,.0f}/s" if row["itemsPerSecond"] else f"{'-':>14}"
+    peak = f"{row['peakBytes'] / (1024 * 1024):>9.1f} MB" if row["peakBytes"] is not None else f"{'-':>12}"
+    line = f"{row['scale']:>4}x  {row['stage']:<50} {row['items']:>10,} {row['seconds']:>9.3f}s {rate} {peak}"
+    counters = row.get("counters", {})
+    if "category_key_cache_hits" in counters:
+        line += f"  category keys {counters['category_key_cache_hits']:,} hit / {counters['category_key_cache_misses']:,} miss"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the content manager import/normalize/merge/write pipeline on synthetic data.")
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated multiples of today's data size (default: 1,10,100)")
+    parser.add_argument("--workers", type=int, default=1, help="process count for the streaming CSV import stage")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass that measures peak memory")
+    parser.add_argument("--json", type=Path, help="also write results as JSON to this path")
+    parser.add_argument("--real-folder", type=Path, help="also compare JSON backends on the scenarios.json/templates.json in this folder")
+    args = parser.parse_args(argv)
+
+    scales = [int(x) for x in args.scales.split(",") if x.strip()]
+    all_results = []
+    print(f"{'scale':>5}  {'stage':<50} {'items':>10} {'time':>10} {'rate':>14} {'peak mem':>12}")
+    default_backend = cm.JSON_BACKEND
+    with tempfile.TemporaryDirectory(prefix="cm-bench-") as tmp:
+        if args.real_folder:
+            for row in compare_json_backends(args.real_folder, Path(tmp), not args.no_memory):
+                print(format_row(row), flush=True)
+                all_results.append(row)
+            cm.set_json_backend(default_backend)
+        for scale in scales:
+            for row in run_scale(scale, Path(tmp), not args.no_memory, args.workers):
+                print(format_row(row), flush=True)
+                all_results.append(row)
+    if args.json:
+        args.json.write_text(json.dumps({"python": sys.version.split()[0], "jsonBackend": default_backend, "results": all_results}, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,123 @@
 #!/usr/bin/env python3
+import argparse
 import csv
+import gzip
+import hashlib
 import json
+import math
+import os
 import re
+import sqlite3
 import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing, contextmanager, nullcontext
 from copy import deepcopy
+from functools import lru_cache
 from pathlib import Path
-import tkinter as tk
-from tkinter import filedialog, messagebox
+
+tk = None
+filedialog = None
+messagebox = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+IMPORT_CHUNK_SIZE = 500
+LARGE_CSV_IMPORT_BYTES = 32 * 1024 * 1024
+PARALLEL_IMPORT_MIN_BYTES = 8 * 1024 * 1024
+WRITE_BUFFER_CHARS = 1024 * 1024
+COMPRESS_CHUNK_BYTES = 1024 * 1024
+PRECOMPRESSED_SUFFIXES = (".gz", ".br")
+TEMPLATE_SHARD_DIR = "templates"
+SCENARIO_SHARD_DIR = "scenarios"
+SCENARIO_SHARD_SIZE = 10
+SHARD_MANIFEST_NAME = "manifest.json"
+GLOBAL_TEMPLATES_SHARD = "_global.json"
+TEMPLATE_SEARCH_INDEX_NAME = "templates.index.json"
+TEMPLATE_SHORTCUTS_NAME = "templates.shortcuts.json"
+TEMPLATE_SEARCH_DB_NAME = "templates.search.db"
+SEARCH_RESULT_LIMIT = 20
+SEARCH_HIGHLIGHT_START = "\x02"
+SEARCH_HIGHLIGHT_END = "\x03"
+SEARCH_FIELD_WEIGHTS = (("name", 10.0), ("shortcut", 5.0), ("content", 1.0))
+SEARCH_FOLDED_WEIGHT = 1.0
+SHORTCUT_COLLISIONS_SHOWN = 5
+DROPPED_DUPLICATES_SHOWN = 5
+SIDE_TABLE_POINTER_SCAN = 64 * 1024
+SIDE_TABLE_POINTER_RE = re.compile(rb'"(companyProfiles|messageTable)"\s*:\s*"([^"\\]+)"')
+COMPANY_PROFILES_STEM = "companies"
+PROFILE_REF = "$profile"
+COMPANY_PROFILE_FIELDS = ("notes", "escalation_preferences", "blocklisted_words")
+MESSAGE_TABLE_STEM = "messages"
+MESSAGE_REF = "$message"
+INTERNED_MESSAGE_TYPES = ("system",)
+CONTENT_DB_NAME = "content.db"
+SCENARIO_JSONL_SUFFIX = ".jsonl"
+JSONL_TAIL_BLOCK = 64 * 1024
+CONTENT_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    seq INTEGER PRIMARY KEY,
+    id TEXT UNIQUE,
+    companyName TEXT NOT NULL DEFAULT '',
+    record BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenarios_company ON scenarios (companyName);
+CREATE TABLE IF NOT EXISTS templates (
+    seq INTEGER PRIMARY KEY,
+    id TEXT,
+    companyName TEXT NOT NULL DEFAULT '',
+    companyKey TEXT NOT NULL DEFAULT '',
+    shortcut TEXT NOT NULL DEFAULT '',
+    record BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS templates_id ON templates (id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    signature TEXT,
+    dirty INTEGER NOT NULL DEFAULT 0
+);
+"""
+CONTENT_DB_SOURCES = (("scenarios", "scenarios.json"), ("templates", "templates.json"))
+TASK_POLL_MS = 100
+CATEGORY_KEY_CACHE_SIZE = 1024
+FILE_CACHE_ENTRIES = 8
+WATCH_INTERVAL_MS = 1000
+JSON_BACKENDS = ("orjson", "json")
+JSON_BACKEND = "json" if orjson is None or os.environ.get("CONTENT_MANAGER_JSON_BACKEND", "").lower() == "json" else "orjson"
+# orjson parses integers outside the 64-bit range as floats without an error,
+# so any run of 20+ digits sends the document to the stdlib parser instead.
+JSON_DIGIT_RUN_TABLE = bytes(48 if 48 <= i <= 57 else 32 for i in range(256))
+JSON_WIDE_DIGIT_RUN = b"0" * 20
+
+CATEGORY_KEY_LEADING_RE = re.compile(r"^[^a-z0-9]+")
+CATEGORY_KEY_SEPARATOR_RE = re.compile(r"[^a-z0-9]+")
+CATEGORY_KEY_RULES = [
+    (re.compile(r"send.*cs"), "send_to_cs"),
+    (re.compile(r"^escalate$|^escalation$|escalat"), "escalate"),
+    (re.compile(r"^tone$"), "tone"),
+    (re.compile(r"template"), "templates"),
+    (re.compile(r"do.*and.*don|dos_and_donts|don_ts|donts"), "dos_and_donts"),
+    (re.compile(r"drive.*purchase"), "drive_to_purchase"),
+    (re.compile(r"promo"), "promo_and_exclusions"),
+]
+SEARCH_TOKEN_RE = re.compile(r"\w{2,}")
+SEARCH_QUERY_TOKEN_RE = re.compile(r"\w+")
+NOTES_LINE_SPLIT_RE = re.compile(r"\r?\n")
+NOTES_HEADING_ITEM_RE = re.compile(r"^\*{0,2}\s*#\s*(.+)$")
+NOTES_SEND_TO_CS_RE = re.compile(r"send\s*to\s*cs|cssupport@|post-purchase|shipping inquiries on a current order", re.I)
 
 
 def normalize_text(value):
@@ -16,6 +126,54 @@ def normalize_text(value):
     return unicodedata.normalize("NFKC", str(value))
 
 
+def set_json_backend(name):
+    global JSON_BACKEND
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {name}")
+    if name == "orjson" and orjson is None:
+        raise ValueError("orjson is not installed.")
+    JSON_BACKEND = name
+
+
+def has_wide_digit_run(raw):
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    return raw.translate(JSON_DIGIT_RUN_TABLE).find(JSON_WIDE_DIGIT_RUN) != -1
+
+
+def json_loads(raw):
+    if JSON_BACKEND == "orjson" and not has_wide_digit_run(raw):
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw)
+
+
+def has_nonportable_float(value):
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, float) and (not math.isfinite(item) or "e" in repr(item)):
+            return True
+    return False
+
+
+def json_dumps_bytes(value, compact=False):
+    if JSON_BACKEND == "orjson" and not has_nonportable_float(value):
+        try:
+            return orjson.dumps(value, option=0 if compact else orjson.OPT_INDENT_2)
+        except TypeError:
+            pass
+    if compact:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return json.dumps(value, indent=2, ensure_ascii=False).encode("utf-8")
+
+
 def parse_json_text(text):
     if text is None:
         return None
@@ -23,7 +181,7 @@ def parse_json_text(text):
     if not raw:
         return None
     try:
-        return json.loads(raw)
+        return json_loads(raw)
     except Exception:
         return None
 
@@ -31,14 +189,211 @@ def parse_json_text(text):
 def read_json_object(path):
     if not path.exists():
         return {}
-    raw = path.read_text(encoding="utf-8").strip()
+    if path.suffix == ".jsonl":
+        return {"scenarios": read_jsonl_scenarios(path)}
+    raw = path.read_bytes().strip()
     if not raw:
         return {}
-    return json.loads(raw)
+    return json_loads(raw)
+
+
+class ImportMetrics:
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+        self.open_stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        self.open_stages.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self.open_stages.pop()
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed - nested
+            if self.open_stages:
+                self.open_stages[-1] += elapsed
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_dict(self):
+        return {
+            "timings": {name: round(seconds, 6) for name, seconds in self.timings.items()},
+            "counters": dict(self.counters),
+        }
+
+    def to_json_line(self, **extra):
+        return json.dumps({**extra, **self.to_dict()}, ensure_ascii=False, separators=(",", ":"))
+
+    def summary(self):
+        timings = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.timings.items())
+        counters = ", ".join(f"{name} {value}" for name, value in self.counters.items())
+        return f"Timings: {timings or 'none'}. Counters: {counters or 'none'}."
+
 
+def emit_metrics_line(metrics, **extra):
+    print(metrics.to_json_line(**extra), file=sys.stderr, flush=True)
 
-def write_json_object(path, value):
-    path.write_text(json.dumps(value, indent=2, ensure_ascii=False), encoding="utf-8")
+
+def fsync_directory(path):
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def open_atomic_output(path, metrics=None, progress=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            yield fh
+            with metrics.stage("disk_write"):
+                fh.flush()
+                os.fsync(fh.fileno())
+        if progress is not None:
+            progress.check_cancelled()
+        with metrics.stage("disk_write"):
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    with metrics.stage("disk_write"):
+        fsync_directory(path.parent)
+
+
+def write_bytes_object(path, data, progress=None, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    written = 0
+    with open_atomic_output(path, metrics, progress) as fh:
+        view = memoryview(data)
+        for start in range(0, len(view), WRITE_BUFFER_CHARS):
+            block = view[start:start + WRITE_BUFFER_CHARS]
+            with metrics.stage("disk_write"):
+                fh.write(block)
+            written += len(block)
+            if progress is not None:
+                progress.set_bytes_written(written)
+    if progress is not None:
+        progress.set_bytes_written(written, check=False)
+    return written
+
+
+def write_json_object(path, value, progress=None, compact=False, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    if JSON_BACKEND == "orjson":
+        with metrics.stage("serialize"):
+            data = json_dumps_bytes(value, compact)
+        return write_bytes_object(path, data, progress, metrics)
+    if compact:
+        encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+    else:
+        encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+    written = 0
+    buffer = []
+    buffered = 0
+    with metrics.stage("serialize"), open_atomic_output(path, metrics, progress) as fh:
+        for piece in encoder.iterencode(value):
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered < WRITE_BUFFER_CHARS:
+                continue
+            data = "".join(buffer).encode("utf-8")
+            with metrics.stage("disk_write"):
+                fh.write(data)
+            written += len(data)
+            buffer = []
+            buffered = 0
+            if progress is not None:
+                progress.set_bytes_written(written)
+        data = "".join(buffer).encode("utf-8")
+        with metrics.stage("disk_write"):
+            fh.write(data)
+        written += len(data)
+    if progress is not None:
+        progress.set_bytes_written(written, check=False)
+    return written
+
+
+def precompressed_sibling(path, suffix):
+    return path.with_name(path.name + suffix)
+
+
+def write_precompressed_siblings(path):
+    with open_atomic_output(precompressed_sibling(path, ".gz")) as out:
+        with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=9, mtime=0) as gz, path.open("rb") as src:
+            while True:
+                block = src.read(COMPRESS_CHUNK_BYTES)
+                if not block:
+                    break
+                gz.write(block)
+
+    if brotli is None:
+        precompressed_sibling(path, ".br").unlink(missing_ok=True)
+        return
+    with open_atomic_output(precompressed_sibling(path, ".br")) as out:
+        compressor = brotli.Compressor(quality=11)
+        with path.open("rb") as src:
+            while True:
+                block = src.read(COMPRESS_CHUNK_BYTES)
+                if not block:
+                    break
+                out.write(compressor.process(block))
+        out.write(compressor.finish())
+
+
+def remove_precompressed_siblings(path):
+    for suffix in PRECOMPRESSED_SUFFIXES:
+        precompressed_sibling(path, suffix).unlink(missing_ok=True)
+
+
+def write_store_file(path, value, progress=None, publish=False, metrics=None, compact=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    if compact is None:
+        compact = publish
+    written = write_json_object(path, value, progress, compact=compact, metrics=metrics)
+    if publish:
+        with metrics.stage("compress"):
+            write_precompressed_siblings(path)
+    else:
+        remove_precompressed_siblings(path)
+    return written
+
+
+def iter_csv_rows(path):
+    with path.open("r", encoding="utf-8-sig", newline="") as fh:
+        yield from csv.DictReader(fh)
+
+
+def iter_chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 def is_message_like(item):
@@ -153,27 +508,34 @@ def parse_list_like_text(text):
 def normalize_guideline_category_key(heading):
     if not heading or not str(heading).strip():
         return "important"
+    return classify_guideline_category_key(str(heading))
+
+
+@lru_cache(maxsize=CATEGORY_KEY_CACHE_SIZE)
+def classify_guideline_category_key(heading):
     key = normalize_text(heading).strip().lower()
-    key = re.sub(r"^[^a-z0-9]+", "", key)
+    key = CATEGORY_KEY_LEADING_RE.sub("", key)
     key = key.replace("&", "and")
-    key = re.sub(r"[^a-z0-9]+", "_", key).strip("_")
-    if re.search(r"send.*cs", key):
-        return "send_to_cs"
-    if re.search(r"^escalate$|^escalation$|escalat", key):
-        return "escalate"
-    if re.search(r"^tone$", key):
-        return "tone"
-    if re.search(r"template", key):
-        return "templates"
-    if re.search(r"do.*and.*don|dos_and_donts|don_ts|donts", key):
-        return "dos_and_donts"
-    if re.search(r"drive.*purchase", key):
-        return "drive_to_purchase"
-    if re.search(r"promo", key):
-        return "promo_and_exclusions"
+    key = CATEGORY_KEY_SEPARATOR_RE.sub("_", key).strip("_")
+    for pattern, category in CATEGORY_KEY_RULES:
+        if pattern.search(key):
+            return category
     return key or "important"
 
 
+def get_category_key_cache_stats():
+    info = classify_guideline_category_key.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+
+def count_category_key_cache(metrics, before):
+    # The cache lives for the whole process, so an import counts only the
+    # lookups made since `before` was taken.
+    after = get_category_key_cache_stats()
+    metrics.count("category_key_cache_hits", after["hits"] - before["hits"])
+    metrics.count("category_key_cache_misses", after["misses"] - before["misses"])
+
+
 def has_styled_math_chars(text):
     if not text:
         return False
@@ -186,7 +548,7 @@ def parse_company_notes_to_categories(notes_text):
         return {}
     notes = {"important": []}
     current_key = "important"
-    for line in re.split(r"\r?\n", raw):
+    for line in NOTES_LINE_SPLIT_RE.split(raw):
         item = line.strip()
         if not item:
             continue
@@ -223,7 +585,7 @@ def normalize_scenario_notes(notes_value):
             txt = normalize_text(item).strip()
             if not txt:
                 continue
-            heading_match = re.match(r"^\*{0,2}\s*#\s*(.+)$", txt)
+            heading_match = NOTES_HEADING_ITEM_RE.match(txt)
             if heading_match:
                 moved = normalize_guideline_category_key(heading_match.group(1))
                 if moved not in notes_out:
@@ -236,7 +598,7 @@ def normalize_scenario_notes(notes_value):
         keep = []
         for item in notes_out["important"]:
             txt = normalize_text(item).strip()
-            if re.search(r"send\s*to\s*cs|cssupport@|post-purchase|shipping inquiries on a current order", txt, re.I):
+            if NOTES_SEND_TO_CS_RE.search(txt):
                 notes_out.setdefault("send_to_cs", [])
                 if "send_to_cs" not in key_order:
                     key_order.append("send_to_cs")
@@ -308,37 +670,571 @@ def convert_scenario_container_to_list(container):
     return []
 
 
-def merge_scenarios_by_id(existing, incoming):
-    result = [normalize_scenario_record_for_storage(item) for item in (existing or [])]
+def side_table_name(stem, data):
+    return f"{stem}.{hashlib.sha1(json_dumps_bytes(data, compact=True)).hexdigest()[:12]}.json"
+
+
+def is_side_table_name(stem, name):
+    return re.fullmatch(rf"{re.escape(stem)}\.[0-9a-f]{{12}}\.json", name) is not None
+
+
+def write_side_table(dest, stem, data, publish=False, created=None):
+    path = dest.with_name(side_table_name(stem, data))
+    if not path.exists() or publish != precompressed_sibling(path, ".gz").exists():
+        if not path.exists() and created is not None:
+            created.append(path)
+        write_store_file(path, data, publish=publish)
+    return path.name
+
+
+def remove_side_table(path):
+    path.unlink(missing_ok=True)
+    remove_precompressed_siblings(path)
+
+
+def read_side_table_pointers(dest):
+    # The pointers are written ahead of the scenarios, so the head of the file
+    # is enough to find them.
+    try:
+        with dest.open("rb") as fh:
+            head = fh.read(SIDE_TABLE_POINTER_SCAN)
+    except FileNotFoundError:
+        return {}
+    return {field.decode(): name.decode("utf-8", "replace") for field, name in SIDE_TABLE_POINTER_RE.findall(head)}
+
+
+def prune_side_table(dest, stem, keep=None, previous=None):
+    # Only the table the previous file pointed at is superseded. A table no
+    # file names any more may be all that is left of a scenarios.json that was
+    # rewritten by a tool that dropped the pointer, so it is kept.
+    if previous and previous != keep and is_side_table_name(stem, previous):
+        remove_side_table(dest.with_name(previous))
+
+
+def read_side_table(scenarios_path, name, key):
+    path = scenarios_path.with_name(name)
+    if not path.exists():
+        raise ValueError(f"{name} referenced by {scenarios_path.name} is missing.")
+    table = read_json_object(path)
+    return table.get(key, {}) if isinstance(table, dict) else {}
+
+
+def is_profile_ref(value):
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(PROFILE_REF), str)
+
+
+def split_company_profiles(scenarios):
+    profiles = {}
+    for item in scenarios:
+        if isinstance(item, dict):
+            company_key = normalize_company_key(item.get("companyName", ""))
+            profiles[company_key] = {field: item[field] for field in COMPANY_PROFILE_FIELDS if field in item}
+    slim = []
+    for item in scenarios:
+        if not isinstance(item, dict):
+            slim.append(item)
+            continue
+        company_key = normalize_company_key(item.get("companyName", ""))
+        profile = profiles[company_key]
+        slim.append({
+            key: {PROFILE_REF: company_key} if key in profile and value == profile[key] else value
+            for key, value in item.items()
+        })
+    return slim, {key: profiles[key] for key in sorted(profiles)}
+
+
+def rehydrate_scenarios(scenarios, profiles=None):
+    flat = []
+    for item in scenarios:
+        if not isinstance(item, dict) or not any(is_profile_ref(value) for value in item.values()):
+            flat.append(item)
+            continue
+        out = {}
+        for key, value in item.items():
+            if is_profile_ref(value):
+                if profiles is None:
+                    raise ValueError(
+                        f"Scenario {item.get('id', '')!r} has a company profile placeholder for {key} but no companyProfiles table is named; "
+                        "restore the companyProfiles field before importing."
+                    )
+                profile = profiles.get(value[PROFILE_REF], {})
+                if key not in profile:
+                    raise ValueError(f"Company profile {value[PROFILE_REF]!r} has no {key}.")
+                value = profile[key]
+            out[key] = value
+        flat.append(out)
+    return flat
+
+
+def message_body_id(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def iter_internable_messages(scenarios):
+    for item in scenarios:
+        if not isinstance(item, dict) or not isinstance(item.get("conversation"), list):
+            continue
+        for msg in item["conversation"]:
+            if isinstance(msg, dict) and msg.get("message_type") in INTERNED_MESSAGE_TYPES and isinstance(msg.get("message_text"), str):
+                yield msg
+
+
+def is_message_ref(value):
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(MESSAGE_REF), str)
+
+
+def intern_scenario_messages(scenarios):
+    seen = {}
+    for msg in iter_internable_messages(scenarios):
+        seen[msg["message_text"]] = seen.get(msg["message_text"], 0) + 1
+    table = {message_body_id(text): text for text, uses in seen.items() if uses > 1}
+    ids = {text: body_id for body_id, text in table.items()}
+    interned = []
+    references = 0
+    bytes_saved = 0
+    for item in scenarios:
+        if not isinstance(item, dict) or not isinstance(item.get("conversation"), list):
+            interned.append(item)
+            continue
+        conversation = []
+        for msg in item["conversation"]:
+            body_id = ids.get(msg.get("message_text")) if isinstance(msg, dict) and msg.get("message_type") in INTERNED_MESSAGE_TYPES else None
+            if body_id is None:
+                conversation.append(msg)
+                continue
+            ref = {MESSAGE_REF: body_id}
+            conversation.append({**msg, "message_text": ref})
+            references += 1
+            bytes_saved += len(json_dumps_bytes(msg["message_text"], compact=True)) - len(json_dumps_bytes(ref, compact=True))
+        interned.append({**item, "conversation": conversation})
+    for body_id, text in table.items():
+        bytes_saved -= len(json_dumps_bytes({body_id: text}, compact=True)) - 1
+    return interned, table, {"bodies": len(table), "references": references, "bytesSaved": bytes_saved}
+
+
+def expand_interned_messages(scenarios, table=None):
+    expanded = []
+    for item in scenarios:
+        conversation = item.get("conversation") if isinstance(item, dict) else None
+        if not isinstance(conversation, list) or not any(isinstance(msg, dict) and is_message_ref(msg.get("message_text")) for msg in conversation):
+            expanded.append(item)
+            continue
+        out = []
+        for msg in conversation:
+            if isinstance(msg, dict) and is_message_ref(msg.get("message_text")):
+                body_id = msg["message_text"][MESSAGE_REF]
+                if table is None:
+                    raise ValueError(
+                        f"Scenario {item.get('id', '')!r} has a message placeholder {body_id} but no messageTable is named; "
+                        "restore the messageTable field before importing."
+                    )
+                if body_id not in table:
+                    raise ValueError(f"Message body {body_id} is missing from the message table.")
+                msg = {**msg, "message_text": table[body_id]}
+            out.append(msg)
+        expanded.append({**item, "conversation": out})
+    return expanded
+
+
+def load_flat_scenarios(scenarios_path):
+    container = read_json_object(scenarios_path)
+    scenarios = convert_scenario_container_to_list(container)
+    messages = None
+    if isinstance(container, dict) and isinstance(container.get("messageTable"), str):
+        messages = read_side_table(scenarios_path, container["messageTable"], "messages")
+    scenarios = expand_interned_messages(scenarios, messages)
+    profiles = None
+    if isinstance(container, dict) and isinstance(container.get("companyProfiles"), str):
+        profiles = read_side_table(scenarios_path, container["companyProfiles"], "companies")
+    return rehydrate_scenarios(scenarios, profiles)
+
+
+def scenario_record_id(item):
+    return normalize_text(item.get("id", "")).strip() if isinstance(item, dict) else ""
+
+
+def iter_jsonl_lines(path):
+    offset = 0
+    with path.open("rb") as fh:
+        for line in fh:
+            start = offset
+            offset += len(line)
+            if not line.endswith(b"\n"):
+                break
+            if line.strip():
+                yield start, line
+
+
+def iter_jsonl_records(path):
+    for number, (_, line) in enumerate(iter_jsonl_lines(path), 1):
+        try:
+            yield json_loads(line)
+        except ValueError as exc:
+            raise ValueError(f"{path.name} line {number}: {exc}") from exc
+
+
+def read_jsonl_scenarios(path):
+    scenarios = []
     id_to_index = {}
-    for i, item in enumerate(result):
+    for item in iter_jsonl_records(path):
+        sid = scenario_record_id(item)
+        if sid and sid in id_to_index:
+            scenarios[id_to_index[sid]] = item
+            continue
+        if sid:
+            id_to_index[sid] = len(scenarios)
+        scenarios.append(item)
+    return scenarios
+
+
+def encode_jsonl_lines(records):
+    return b"".join(json_dumps_bytes(item, compact=True) + b"\n" for item in records)
+
+
+def write_jsonl_object(path, records, progress=None, metrics=None):
+    return write_bytes_object(path, encode_jsonl_lines(records), progress, metrics)
+
+
+def jsonl_complete_size(fh, size):
+    end = size
+    while end > 0:
+        start = max(0, end - JSONL_TAIL_BLOCK)
+        fh.seek(start)
+        cut = fh.read(end - start).rfind(b"\n")
+        if cut >= 0:
+            return start + cut + 1
+        end = start
+    return 0
+
+
+def append_jsonl_records(path, records, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    lines = [json_dumps_bytes(item, compact=True) + b"\n" for item in records]
+    with path.open("ab") as fh:
+        size = fh.tell()
+        if size:
+            with path.open("rb") as tail:
+                # A torn last line is cut back to the previous newline, scanning
+                # backwards in blocks so the store is never read whole.
+                complete = jsonl_complete_size(tail, size)
+            if complete != size:
+                fh.truncate(complete)
+                size = complete
+        offsets = []
+        for line in lines:
+            offsets.append(size)
+            size += len(line)
+        fh.write(b"".join(lines))
+        with metrics.stage("disk_write"):
+            fh.flush()
+            os.fsync(fh.fileno())
+    metrics.count("jsonl_bytes_appended", sum(len(line) for line in lines))
+    return offsets
+
+
+def index_jsonl_offsets(path):
+    offsets = {}
+    for offset, line in iter_jsonl_lines(path):
+        sid = scenario_record_id(json_loads(line))
+        if sid:
+            offsets[sid] = offset
+    return offsets
+
+
+def read_jsonl_record(fh, offset):
+    fh.seek(offset)
+    return json_loads(fh.readline())
+
+
+def scan_jsonl_order(path):
+    # Offsets of the winning line per id, in first-seen order; lines without an
+    # id are kept where they are.
+    first_seen = []
+    latest = {}
+    lines = 0
+    for offset, line in iter_jsonl_lines(path):
+        lines += 1
+        sid = scenario_record_id(json_loads(line))
+        if not sid:
+            first_seen.append(offset)
+            continue
+        if sid not in latest:
+            first_seen.append(sid)
+        latest[sid] = offset
+    return lines, [latest[entry] if isinstance(entry, str) else entry for entry in first_seen]
+
+
+def write_jsonl_as_json(store, dest, progress=None, publish=False, metrics=None):
+    # Copies the winning lines straight into scenarios.json, so the export
+    # holds an offset per record rather than the records themselves.
+    if metrics is None:
+        metrics = ImportMetrics()
+    with metrics.stage("jsonl_scan"):
+        _, order = scan_jsonl_order(store)
+    previous = read_side_table_pointers(dest)
+    written = 0
+    with metrics.stage("disk_write"), open_atomic_output(dest, metrics, progress) as out, store.open("rb") as src:
+        out.write(b'{"scenarios":[')
+        for position, offset in enumerate(order):
+            src.seek(offset)
+            data = (b"\n" if position == 0 else b",\n") + src.readline().rstrip(b"\n")
+            out.write(data)
+            written += len(data)
+            if progress is not None:
+                progress.set_bytes_written(written)
+        out.write(b"\n]}\n")
+    if publish:
+        with metrics.stage("compress"):
+            write_precompressed_siblings(dest)
+    else:
+        remove_precompressed_siblings(dest)
+    write_count_sidecar(dest, len(order))
+    remove_shard_dir(dest.parent / SCENARIO_SHARD_DIR)
+    prune_side_table(dest, COMPANY_PROFILES_STEM, None, previous.get("companyProfiles"))
+    prune_side_table(dest, MESSAGE_TABLE_STEM, None, previous.get("messageTable"))
+    return written
+
+
+def jsonl_sync_path(store):
+    return store.with_name(f".{store.name}.meta")
+
+
+def read_jsonl_sync(store):
+    try:
+        return read_json_object(jsonl_sync_path(store))
+    except ValueError:
+        return {}
+
+
+def record_jsonl_sync(store, dest, dirty=False):
+    signature = file_signature(dest)
+    sync = {"dirty": dirty}
+    if signature is not None:
+        sync.update(mtimeNs=signature[0], size=signature[1])
+    write_json_object(jsonl_sync_path(store), sync)
+
+
+def mark_jsonl_dirty(store, dest):
+    sync = read_jsonl_sync(store)
+    sync["dirty"] = True
+    write_json_object(jsonl_sync_path(store), sync)
+
+
+def restore_jsonl_checkpoint(store, checkpoint):
+    size, sync = checkpoint
+    with store.open("r+b") as fh:
+        fh.truncate(size)
+        os.fsync(fh.fileno())
+    write_json_object(jsonl_sync_path(store), sync)
+
+
+def sync_jsonl_store(store, dest, metrics=None, keep_dirty=False):
+    # Plain imports rewrite scenarios.json without touching the store; a clean
+    # store whose last sync no longer matches the file is rebuilt from it. A
+    # dirty one either wins (export) or is a conflict (import).
+    if metrics is None:
+        metrics = ImportMetrics()
+    current = file_signature(dest)
+    if store.exists():
+        sync = read_jsonl_sync(store)
+        if current is None or (sync.get("mtimeNs"), sync.get("size")) == current:
+            return False
+        if sync.get("dirty") and keep_dirty:
+            return False
+        if sync.get("dirty"):
+            raise ValueError(
+                f"{dest.name} changed outside {store.name}, which also has unexported changes. "
+                f"Run compact-scenarios --export to keep the {store.name} copy, or delete {store.name} to rebuild it from {dest.name}."
+            )
+        metrics.count("jsonl_reseeded", 1)
+    with metrics.stage("read_existing"):
+        existing_list = load_flat_scenarios(dest)
+    write_jsonl_object(store, [normalize_scenario_record_for_storage(item) for item in existing_list], metrics=metrics)
+    record_jsonl_sync(store, dest)
+    return True
+
+
+def export_jsonl_scenarios(store, dest, metrics=None):
+    if sync_jsonl_store(store, dest, metrics, keep_dirty=True):
+        return False
+    write_jsonl_as_json(store, dest, metrics=metrics)
+    record_jsonl_sync(store, dest)
+    return True
+
+
+def compact_jsonl_scenarios(path, progress=None, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    with metrics.stage("compact_scan"):
+        lines, order = scan_jsonl_order(path)
+    kept = 0
+    with metrics.stage("compact_write"), open_atomic_output(path, metrics) as out, path.open("rb") as src:
+        for offset in order:
+            src.seek(offset)
+            out.write(src.readline())
+            kept += 1
+            if progress is not None:
+                progress.add_rows(1)
+    return {"lines": lines, "records": kept, "folded": lines - kept}
+
+
+def index_scenarios_by_id(scenarios):
+    id_to_index = {}
+    for i, item in enumerate(scenarios):
+        if not isinstance(item, dict):
+            continue
         sid = normalize_text(item.get("id", "")).strip()
         if sid and sid not in id_to_index:
             id_to_index[sid] = i
+    return id_to_index
+
+
+def start_scenario_merge(existing, incremental=False, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    if incremental:
+        result = list(existing or [])
+        touched = set()
+    else:
+        with metrics.stage("normalize"):
+            result = [normalize_scenario_record_for_storage(item) for item in (existing or [])]
+        touched = None
+    with metrics.stage("merge"):
+        id_to_index = index_scenarios_by_id(result)
+    return result, id_to_index, touched
+
+
+def merge_scenarios_into(result, id_to_index, incoming, touched=None, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    with metrics.stage("merge"):
+        return merge_scenario_batch(result, id_to_index, incoming, touched, metrics)
+
 
+def merge_scenario_record(base, item_norm):
+    merged = {**base, **item_norm}
+    if base.get("rightPanel") or item_norm.get("rightPanel"):
+        merged["rightPanel"] = {**(base.get("rightPanel") or {}), **(item_norm.get("rightPanel") or {})}
+    return merged
+
+
+def merge_scenario_batch(result, id_to_index, incoming, touched, metrics):
     updated = 0
     added = 0
 
     for item in (incoming or []):
-        item_norm = normalize_scenario_record_for_storage(item)
+        with metrics.stage("normalize"):
+            item_norm = normalize_scenario_record_for_storage(item)
         incoming_id = normalize_text(item_norm.get("id", "")).strip()
+        if not incoming_id:
+            metrics.count("rows_without_id")
         if incoming_id and incoming_id in id_to_index:
             idx = id_to_index[incoming_id]
-            base = normalize_scenario_record_for_storage(result[idx])
-            merged = {**base, **item_norm}
-            if base.get("rightPanel") or item_norm.get("rightPanel"):
-                merged["rightPanel"] = {**(base.get("rightPanel") or {}), **(item_norm.get("rightPanel") or {})}
-            result[idx] = normalize_scenario_record_for_storage(merged)
+            base = result[idx]
+            if touched is not None and idx not in touched:
+                with metrics.stage("normalize"):
+                    base = normalize_scenario_record_for_storage(base)
+                touched.add(idx)
+            result[idx] = merge_scenario_record(base, item_norm)
             updated += 1
             continue
         result.append(item_norm)
         added += 1
+        if touched is not None:
+            touched.add(len(result) - 1)
         if incoming_id:
             id_to_index[incoming_id] = len(result) - 1
 
+    return updated, added
+
+
+def merge_scenarios_by_id(existing, incoming, incremental=False, metrics=None):
+    result, id_to_index, touched = start_scenario_merge(existing, incremental, metrics)
+    updated, added = merge_scenarios_into(result, id_to_index, incoming, touched, metrics)
     return {"scenarios": result, "updated": updated, "added": added}
 
 
+def resolve_import_workers(src):
+    try:
+        if src.stat().st_size < PARALLEL_IMPORT_MIN_BYTES:
+            return 1
+    except OSError:
+        return 1
+    return os.cpu_count() or 1
+
+
+def open_conversion_pool(workers):
+    if workers and workers > 1:
+        return ProcessPoolExecutor(max_workers=workers, initializer=init_conversion_worker)
+    return nullcontext(None)
+
+
+def init_conversion_worker():
+    global WORKER_PARSE_CACHE
+    WORKER_PARSE_CACHE = CompanyFieldCache()
+
+
+def convert_csv_row_in_worker(row):
+    cache = WORKER_PARSE_CACHE
+    hits, misses = cache.hits, cache.misses
+    category_keys = get_category_key_cache_stats()
+    metrics = ImportMetrics()
+    scenario = convert_csv_row_to_scenario(row, cache, metrics)
+    count_category_key_cache(metrics, category_keys)
+    return scenario, cache.hits - hits, cache.misses - misses, metrics.counters
+
+
+def convert_csv_rows(rows, executor=None, workers=1, cache=None, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    if executor is None:
+        with metrics.stage("convert"):
+            return [convert_csv_row_to_scenario(row, cache, metrics) for row in rows]
+    batch = max(1, len(rows) // (workers * 4))
+    out = []
+    with metrics.stage("convert"):
+        for scenario, hits, misses, counters in executor.map(convert_csv_row_in_worker, rows, chunksize=batch):
+            if cache is not None:
+                cache.hits += hits
+                cache.misses += misses
+            for name, amount in counters.items():
+                metrics.count(name, amount)
+            out.append(scenario)
+    return out
+
+
+def stream_merge_csv_scenarios(existing, src, chunk_size=IMPORT_CHUNK_SIZE, incremental=False, workers=1, progress=None, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    result, id_to_index, touched = start_scenario_merge(existing, incremental, metrics)
+    updated = 0
+    added = 0
+    rows = 0
+    cache = CompanyFieldCache()
+    for incoming in iter_converted_csv_chunks(src, chunk_size, workers, cache, metrics):
+        chunk_updated, chunk_added = merge_scenarios_into(result, id_to_index, incoming, touched, metrics)
+        updated += chunk_updated
+        added += chunk_added
+        rows += len(incoming)
+        if progress is not None:
+            progress.add_rows(len(incoming))
+    return {"scenarios": result, "updated": updated, "added": added, "rows": rows, "cache": cache.stats()}
+
+
+def iter_converted_csv_chunks(src, chunk_size=IMPORT_CHUNK_SIZE, workers=1, cache=None, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    chunks = iter_chunks(iter_csv_rows(src), chunk_size)
+    with open_conversion_pool(workers) as executor:
+        while True:
+            with metrics.stage("csv_decode"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            yield convert_csv_rows(chunk, executor, workers, cache, metrics)
+
+
 def get_obj_prop_value(obj, names):
     if not isinstance(obj, dict):
         return None
@@ -369,10 +1265,60 @@ def normalize_message_media(media):
     return result
 
 
-def convert_csv_row_to_scenario(row):
+class CompanyFieldCache:
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, field, raw, parse):
+        key = (field, raw)
+        if key in self.entries:
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        value = parse(raw)
+        self.entries[key] = value
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+WORKER_PARSE_CACHE = None
+
+
+def parse_company_notes_field(text):
+    return parse_company_notes_to_categories(normalize_text(text).strip())
+
+
+def parse_company_list_field(text):
+    return convert_to_string_array(parse_list_like_text(normalize_text(text)))
+
+
+def parse_embedded_json(text, metrics=None):
+    if metrics is None:
+        return parse_json_text(text)
+    raw = normalize_text(text).strip()
+    if not raw:
+        return None
+    with metrics.stage("json_parse"):
+        try:
+            return json_loads(raw)
+        except Exception:
+            metrics.count("unparseable_json_cells")
+            return None
+
+
+def convert_csv_row_to_scenario(row, cache=None, metrics=None):
     conversation = []
     conversation_raw = normalize_text(row.get("CONVERSATION_JSON", ""))
-    conversation_parsed = parse_json_text(conversation_raw)
+    conversation_parsed = parse_embedded_json(conversation_raw, metrics)
     if isinstance(conversation_parsed, list):
         for msg in conversation_parsed:
             if not isinstance(msg, dict):
@@ -394,7 +1340,7 @@ def convert_csv_row_to_scenario(row):
             conversation.append(entry)
 
     browsing_history = []
-    products_parsed = parse_json_text(normalize_text(row.get("LAST_5_PRODUCTS", "")))
+    products_parsed = parse_embedded_json(normalize_text(row.get("LAST_5_PRODUCTS", "")), metrics)
     if isinstance(products_parsed, list):
         for p in products_parsed:
             if not isinstance(p, dict):
@@ -412,7 +1358,7 @@ def convert_csv_row_to_scenario(row):
             browsing_history.append(item)
 
     orders_out = []
-    orders_parsed = parse_json_text(normalize_text(row.get("ORDERS", "")))
+    orders_parsed = parse_embedded_json(normalize_text(row.get("ORDERS", "")), metrics)
     if isinstance(orders_parsed, list):
         for order in orders_parsed:
             if not isinstance(order, dict):
@@ -454,7 +1400,14 @@ def convert_csv_row_to_scenario(row):
     if orders_out:
         right_panel["orders"] = orders_out
 
-    notes = parse_company_notes_to_categories(normalize_text(row.get("COMPANY_NOTES", "")).strip())
+    if cache is None:
+        notes = parse_company_notes_field(row.get("COMPANY_NOTES", ""))
+        escalation_preferences = parse_company_list_field(row.get("ESCALATION_TOPICS"))
+        blocklisted_words = parse_company_list_field(row.get("BLOCKLISTED_WORDS"))
+    else:
+        notes = cache.get("COMPANY_NOTES", row.get("COMPANY_NOTES", ""), parse_company_notes_field)
+        escalation_preferences = cache.get("ESCALATION_TOPICS", row.get("ESCALATION_TOPICS"), parse_company_list_field)
+        blocklisted_words = cache.get("BLOCKLISTED_WORDS", row.get("BLOCKLISTED_WORDS"), parse_company_list_field)
 
     return {
         "id": normalize_text(row.get("SEND_ID")).strip(),
@@ -465,23 +1418,1211 @@ def convert_csv_row_to_scenario(row):
         "conversation": conversation,
         "notes": notes,
         "rightPanel": right_panel,
-        "escalation_preferences": convert_to_string_array(parse_list_like_text(normalize_text(row.get("ESCALATION_TOPICS")))),
-        "blocklisted_words": convert_to_string_array(parse_list_like_text(normalize_text(row.get("BLOCKLISTED_WORDS")))),
+        "escalation_preferences": escalation_preferences,
+        "blocklisted_words": blocklisted_words,
+    }
+
+
+class OperationCancelled(Exception):
+    pass
+
+
+class OperationProgress:
+    def __init__(self):
+        self.rows = 0
+        self.bytes_written = 0
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise OperationCancelled()
+
+    def add_rows(self, count):
+        self.rows += count
+        self.check_cancelled()
+
+    def set_bytes_written(self, count, check=True):
+        self.bytes_written = count
+        if check:
+            self.check_cancelled()
+
+    def describe(self):
+        return f"Rows processed: {self.rows:,} | Bytes written: {self.bytes_written:,}"
+
+
+def count_sidecar_path(path):
+    return path.with_name(f".{path.name}.meta")
+
+
+def write_count_sidecar(path, count):
+    stat = path.stat()
+    write_json_object(count_sidecar_path(path), {"count": count, "size": stat.st_size, "mtimeNs": stat.st_mtime_ns})
+    FILE_CACHE.prime(path, "count", count)
+
+
+def file_signature(path):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ParsedFileCache:
+    # Holds small values derived from a file (item counts), keyed by path and
+    # validated by (mtime, size). Parsed stores are not kept: they are too
+    # big to hold for the life of the GUI and each import reads them once.
+    def __init__(self, max_entries=FILE_CACHE_ENTRIES):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, path, kind, loader):
+        key = (os.path.abspath(path), kind)
+        signature = file_signature(path)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == signature:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        value = loader(path)
+        self.store(key, signature, value)
+        return value
+
+    def prime(self, path, kind, value):
+        self.store((os.path.abspath(path), kind), file_signature(path), value)
+
+    def store(self, key, signature, value):
+        self.entries.pop(key, None)
+        self.entries[key] = (signature, value)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+FILE_CACHE = ParsedFileCache()
+
+
+class FolderWatcher:
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self):
+        return [file_signature(path) for path in self.paths]
+
+    def reset(self, paths=None):
+        if paths is not None:
+            self.paths = list(paths)
+        self.snapshot = self.take_snapshot()
+
+    def changed(self):
+        current = self.take_snapshot()
+        if current == self.snapshot:
+            return False
+        self.snapshot = current
+        return True
+
+
+def read_cached_count(path, count_payload):
+    return FILE_CACHE.lookup(path, "count", lambda p: load_item_count(p, count_payload))
+
+
+def load_item_count(path, count_payload):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return 0
+    try:
+        meta = read_json_object(count_sidecar_path(path))
+        if meta.get("size") == stat.st_size and meta.get("mtimeNs") == stat.st_mtime_ns:
+            return int(meta["count"])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    count = count_payload(read_json_object(path))
+    try:
+        write_count_sidecar(path, count)
+    except OSError:
+        pass
+    return count
+
+
+def read_content_counts(scenarios_path, templates_path):
+    return read_cached_count(scenarios_path, get_scenario_count), read_cached_count(templates_path, get_template_count)
+
+
+def normalize_company_key(value):
+    return normalize_text(value).strip().lower()
+
+
+def company_shard_name(company_key):
+    slug = re.sub(r"[^a-z0-9]+", "-", company_key).strip("-")[:48] or "company"
+    digest = hashlib.sha1(company_key.encode("utf-8")).hexdigest()[:8]
+    return f"{slug}-{digest}.json"
+
+
+def convert_template_container_to_list(container):
+    if isinstance(container, list):
+        return list(container)
+    if isinstance(container, dict) and isinstance(container.get("templates"), list):
+        return list(container["templates"])
+    return []
+
+
+def is_shard_file_name(name):
+    return name.endswith(".json") or any(name.endswith(".json" + suffix) for suffix in PRECOMPRESSED_SUFFIXES)
+
+
+def prune_shard_dir(shard_dir, keep):
+    keep_names = set()
+    for name in keep:
+        keep_names.add(name)
+        keep_names.update(name + suffix for suffix in PRECOMPRESSED_SUFFIXES)
+    for child in shard_dir.iterdir():
+        if child.is_file() and is_shard_file_name(child.name) and child.name not in keep_names:
+            child.unlink(missing_ok=True)
+
+
+def remove_shard_dir(shard_dir):
+    if not (shard_dir / SHARD_MANIFEST_NAME).exists():
+        return
+    prune_shard_dir(shard_dir, [])
+    try:
+        shard_dir.rmdir()
+    except OSError:
+        pass
+
+
+def write_template_shards(shard_dir, templates, publish=False):
+    global_templates = []
+    by_company = {}
+    display_names = {}
+    for tpl in templates:
+        if not isinstance(tpl, dict):
+            continue
+        key = normalize_company_key(tpl.get("companyName"))
+        if not key:
+            global_templates.append(tpl)
+            continue
+        by_company.setdefault(key, []).append(tpl)
+        display_names.setdefault(key, normalize_text(tpl.get("companyName")).strip())
+
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "global": {"file": GLOBAL_TEMPLATES_SHARD, "count": len(global_templates)},
+        "companies": {},
+    }
+    write_store_file(shard_dir / GLOBAL_TEMPLATES_SHARD, {"templates": global_templates}, publish=publish)
+    for key, items in by_company.items():
+        file_name = company_shard_name(key)
+        write_store_file(shard_dir / file_name, {"templates": items}, publish=publish)
+        manifest["companies"][key] = {"companyName": display_names[key], "file": file_name, "count": len(items)}
+    write_store_file(shard_dir / SHARD_MANIFEST_NAME, manifest, publish=publish)
+    prune_shard_dir(shard_dir, [SHARD_MANIFEST_NAME, GLOBAL_TEMPLATES_SHARD] + [v["file"] for v in manifest["companies"].values()])
+    return manifest
+
+
+def tokenize_search_text(value):
+    return SEARCH_TOKEN_RE.findall(normalize_text(value).casefold())
+
+
+def build_template_search_index(templates):
+    tokens = {}
+    shortcuts = {}
+    for position, tpl in enumerate(templates):
+        if not isinstance(tpl, dict):
+            continue
+        seen = set()
+        for field in ("name", "shortcut", "content"):
+            for token in tokenize_search_text(tpl.get(field)):
+                if token in seen:
+                    continue
+                seen.add(token)
+                tokens.setdefault(token, []).append(position)
+        shortcut = normalize_text(tpl.get("shortcut", "")).strip().lower()
+        if shortcut:
+            shortcuts.setdefault(shortcut, []).append(position)
+    return {
+        "count": len(templates),
+        "tokens": {token: tokens[token] for token in sorted(tokens)},
+        "shortcuts": shortcuts,
     }
 
 
+def write_template_search_index(dest, templates, publish=False):
+    index_path = dest.with_name(TEMPLATE_SEARCH_INDEX_NAME)
+    write_store_file(index_path, build_template_search_index(templates), publish=publish, compact=True)
+    return index_path
+
+
+@lru_cache(maxsize=1)
+def fts5_available():
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def template_search_db_path(dest):
+    return dest.with_name(TEMPLATE_SEARCH_DB_NAME)
+
+
+def raw_search_field(value):
+    return "" if value is None else str(value)
+
+
+def template_search_row(position, tpl):
+    # The searchable columns hold the raw templates.json text so highlight
+    # offsets index into it directly; NFKC forms that differ (fullwidth,
+    # styled letters, ligatures) go into the hidden folded column instead.
+    raw = [raw_search_field(tpl.get(field)) for field, _ in SEARCH_FIELD_WEIGHTS]
+    folded = " ".join(normalize_text(text) for text in raw if normalize_text(text) != text)
+    return (
+        *raw,
+        folded,
+        normalize_company_key(tpl.get("companyName", "")),
+        position,
+        normalize_text(tpl.get("id", "")),
+        raw_search_field(tpl.get("companyName")),
+    )
+
+
+def write_template_search_db(dest, templates):
+    db_path = template_search_db_path(dest)
+    try:
+        mode = db_path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{db_path.name}.", suffix=".tmp", dir=str(db_path.parent))
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_name)
+        try:
+            fields = ", ".join(field for field, _ in SEARCH_FIELD_WEIGHTS)
+            conn.execute(f"CREATE VIRTUAL TABLE templates_fts USING fts5({fields}, folded, company UNINDEXED, position UNINDEXED, id UNINDEXED, companyName UNINDEXED, tokenize='unicode61 remove_diacritics 2')")
+            with conn:
+                conn.executemany(
+                    "INSERT INTO templates_fts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (template_search_row(position, tpl) for position, tpl in enumerate(templates) if isinstance(tpl, dict)),
+                )
+            conn.execute("INSERT INTO templates_fts (templates_fts) VALUES ('optimize')")
+            conn.commit()
+        finally:
+            conn.close()
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, db_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return db_path
+
+
+def build_search_match(query):
+    tokens = SEARCH_QUERY_TOKEN_RE.findall(normalize_text(query).casefold())
+    return " AND ".join(f'"{token}"*' for token in tokens)
+
+
+def parse_highlight_offsets(marked):
+    offsets = []
+    plain_length = 0
+    start = None
+    for piece in re.split(f"([{SEARCH_HIGHLIGHT_START}{SEARCH_HIGHLIGHT_END}])", marked):
+        if piece == SEARCH_HIGHLIGHT_START:
+            start = plain_length
+        elif piece == SEARCH_HIGHLIGHT_END:
+            if start is not None:
+                offsets.append([start, plain_length])
+            start = None
+        else:
+            plain_length += len(piece)
+    return offsets
+
+
+def search_templates(dest, query, company=None, limit=SEARCH_RESULT_LIMIT, include_global=True):
+    db_path = template_search_db_path(dest)
+    if not db_path.exists():
+        raise ValueError(f"{db_path.name} not found; import templates to build it.")
+    match = build_search_match(query)
+    if not match:
+        return []
+    weights = ", ".join(str(weight) for _, weight in SEARCH_FIELD_WEIGHTS + (("folded", SEARCH_FOLDED_WEIGHT),))
+    highlights = ", ".join(
+        f"highlight(templates_fts, {column}, '{SEARCH_HIGHLIGHT_START}', '{SEARCH_HIGHLIGHT_END}')"
+        for column in range(len(SEARCH_FIELD_WEIGHTS))
+    )
+    sql = f"SELECT position, id, companyName, name, shortcut, bm25(templates_fts, {weights}) AS score, {highlights} FROM templates_fts WHERE templates_fts MATCH ?"
+    params = [match]
+    if company is not None:
+        companies = [normalize_company_key(company)] + ([""] if include_global else [])
+        sql += f" AND company IN ({', '.join('?' for _ in companies)})"
+        params.extend(companies)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+    conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    results = []
+    for position, tpl_id, company_name, name, shortcut, score, *marked in rows:
+        results.append({
+            "position": position,
+            "id": tpl_id,
+            "companyName": company_name,
+            "name": name,
+            "shortcut": shortcut,
+            "score": -score,
+            "highlights": {
+                field: offsets
+                for (field, _), offsets in zip(SEARCH_FIELD_WEIGHTS, (parse_highlight_offsets(text) for text in marked))
+                if offsets
+            },
+        })
+    return results
+
+
+def normalize_shortcut(value):
+    return normalize_text(value).strip().lower()
+
+
+def build_shortcut_table(templates):
+    companies = {}
+    for position, tpl in enumerate(templates):
+        if not isinstance(tpl, dict):
+            continue
+        shortcut = normalize_shortcut(tpl.get("shortcut", ""))
+        if shortcut:
+            company_key = normalize_company_key(tpl.get("companyName", ""))
+            companies.setdefault(company_key, {}).setdefault(shortcut, []).append(position)
+    lookup = {}
+    collisions = []
+    for company_key in sorted(companies):
+        shortcuts = companies[company_key]
+        lookup[company_key] = {shortcut: positions[0] for shortcut, positions in sorted(shortcuts.items())}
+        for shortcut, positions in sorted(shortcuts.items()):
+            if len(positions) > 1:
+                collisions.append({
+                    "companyName": templates[positions[0]].get("companyName", ""),
+                    "shortcut": shortcut,
+                    "positions": positions,
+                    "ids": [templates[pos].get("id", "") for pos in positions],
+                })
+    return {"count": len(templates), "companies": lookup, "collisions": collisions}
+
+
+def write_template_shortcut_table(dest, templates, publish=False):
+    table = build_shortcut_table(templates)
+    write_store_file(dest.with_name(TEMPLATE_SHORTCUTS_NAME), table, publish=publish, compact=True)
+    return table
+
+
+def describe_shortcut_collisions(collisions):
+    if not collisions:
+        return ""
+    lines = [f"Shortcut collisions: {len(collisions)} (first template wins in {TEMPLATE_SHORTCUTS_NAME})."]
+    for collision in collisions[:SHORTCUT_COLLISIONS_SHOWN]:
+        company = collision["companyName"] or "(global)"
+        ids = ", ".join(str(tpl_id) or f"#{pos}" for tpl_id, pos in zip(collision["ids"], collision["positions"]))
+        lines.append(f"  {company} '{collision['shortcut']}': {ids}")
+    if len(collisions) > SHORTCUT_COLLISIONS_SHOWN:
+        lines.append(f"  ... and {len(collisions) - SHORTCUT_COLLISIONS_SHOWN} more")
+    return "\n".join(lines)
+
+
+def write_templates_output(dest, payload, progress=None, publish=False, shard=False, metrics=None, index=True, search_index=False):
+    if metrics is None:
+        metrics = ImportMetrics()
+    write_store_file(dest, payload, progress, publish, metrics)
+    write_count_sidecar(dest, get_template_count(payload))
+    with metrics.stage("shortcut_table"):
+        shortcut_table = write_template_shortcut_table(dest, convert_template_container_to_list(payload), publish)
+    metrics.count("shortcut_collisions", len(shortcut_table["collisions"]))
+    # The token index is only for external tools: the web app does its own
+    # substring matching and never reads it, so it is opt-in.
+    with metrics.stage("search_index"):
+        if search_index:
+            write_template_search_index(dest, convert_template_container_to_list(payload), publish)
+        else:
+            index_path = dest.with_name(TEMPLATE_SEARCH_INDEX_NAME)
+            index_path.unlink(missing_ok=True)
+            remove_precompressed_siblings(index_path)
+    with metrics.stage("search_db"):
+        if index and fts5_available():
+            write_template_search_db(dest, convert_template_container_to_list(payload))
+        else:
+            template_search_db_path(dest).unlink(missing_ok=True)
+    shard_dir = dest.parent / TEMPLATE_SHARD_DIR
+    with metrics.stage("shards"):
+        if shard:
+            write_template_shards(shard_dir, convert_template_container_to_list(payload), publish)
+        else:
+            remove_shard_dir(shard_dir)
+    return shortcut_table
+
+
+def build_scenario_index_entry(scenario, shard_name, position):
+    conversation = scenario.get("conversation")
+    return {
+        "id": normalize_text(scenario.get("id", "")).strip(),
+        "companyName": normalize_text(scenario.get("companyName", "")).strip(),
+        "agentName": normalize_text(scenario.get("agentName", "")).strip(),
+        "messageCount": len(conversation) if isinstance(conversation, list) else 0,
+        "shard": shard_name,
+        "position": position,
+    }
+
+
+def write_scenario_shards(shard_dir, scenarios, publish=False):
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    records = [item for item in scenarios if isinstance(item, dict)]
+    index = []
+    shard_names = []
+    for start in range(0, len(records), SCENARIO_SHARD_SIZE):
+        chunk = records[start:start + SCENARIO_SHARD_SIZE]
+        payload = {"scenarios": chunk}
+        digest = hashlib.sha1(json_dumps_bytes(payload, compact=True)).hexdigest()[:16]
+        shard_name = f"chunk-{digest}.json"
+        shard_path = shard_dir / shard_name
+        if not shard_path.exists() or publish != precompressed_sibling(shard_path, ".gz").exists():
+            write_store_file(shard_path, payload, publish=publish)
+        shard_names.append(shard_name)
+        for position, scenario in enumerate(chunk):
+            index.append(build_scenario_index_entry(scenario, shard_name, position))
+    manifest = {"shardSize": SCENARIO_SHARD_SIZE, "scenarios": index}
+    write_store_file(shard_dir / SHARD_MANIFEST_NAME, manifest, publish=publish)
+    prune_shard_dir(shard_dir, [SHARD_MANIFEST_NAME] + shard_names)
+    return manifest
+
+
+def write_scenarios_output(dest, payload, progress=None, publish=False, shard=False, metrics=None, profiles=False, intern=False):
+    if metrics is None:
+        metrics = ImportMetrics()
+    flat = convert_scenario_container_to_list(payload)
+    stored = flat
+    refs = {}
+    created = []
+    previous = read_side_table_pointers(dest)
+    try:
+        if profiles:
+            with metrics.stage("company_profiles"):
+                stored, company_profiles = split_company_profiles(stored)
+                refs["companyProfiles"] = write_side_table(dest, COMPANY_PROFILES_STEM, {"companies": company_profiles}, publish, created)
+            metrics.count("company_profiles", len(company_profiles))
+        if intern:
+            with metrics.stage("intern_messages"):
+                stored, table, report = intern_scenario_messages(stored)
+                refs["messageTable"] = write_side_table(dest, MESSAGE_TABLE_STEM, {"messages": table}, publish, created)
+            metrics.count("interned_bodies", report["bodies"])
+            metrics.count("interned_references", report["references"])
+            metrics.count("interned_bytes_saved", report["bytesSaved"])
+        if stored is not flat:
+            extra = {key: value for key, value in payload.items() if key not in ("companyProfiles", "messageTable", "scenarios")} if isinstance(payload, dict) else {}
+            payload = {**refs, **extra, "scenarios": stored}
+        written = write_store_file(dest, payload, progress, publish, metrics)
+    except BaseException:
+        for path in created:
+            remove_side_table(path)
+        raise
+    write_count_sidecar(dest, get_scenario_count(payload))
+    shard_dir = dest.parent / SCENARIO_SHARD_DIR
+    with metrics.stage("shards"):
+        if shard:
+            write_scenario_shards(shard_dir, flat, publish)
+        else:
+            remove_shard_dir(shard_dir)
+    prune_side_table(dest, COMPANY_PROFILES_STEM, refs.get("companyProfiles"), previous.get("companyProfiles"))
+    prune_side_table(dest, MESSAGE_TABLE_STEM, refs.get("messageTable"), previous.get("messageTable"))
+    return written
+
+
+def content_db_path(folder):
+    return folder / CONTENT_DB_NAME
+
+
+def open_content_db(folder, metrics=None, keep_dirty=False):
+    if metrics is None:
+        metrics = ImportMetrics()
+    conn = sqlite3.connect(content_db_path(folder))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(CONTENT_DB_SCHEMA)
+    migrate_content_db(conn)
+    with metrics.stage("db_seed"):
+        seed_content_db(conn, folder, metrics, keep_dirty)
+    return conn
+
+
+def migrate_content_db(conn):
+    # Databases from before companyKey get the column backfilled from
+    # companyName, so template merges can look rows up by their merge key.
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(templates)")}
+    with conn:
+        if "companyKey" not in columns:
+            conn.execute("ALTER TABLE templates ADD COLUMN companyKey TEXT NOT NULL DEFAULT ''")
+            conn.executemany(
+                "UPDATE templates SET companyKey = ? WHERE seq = ?",
+                [(normalize_company_key(company_name), seq) for seq, company_name in conn.execute("SELECT seq, companyName FROM templates")],
+            )
+        conn.execute("DROP INDEX IF EXISTS templates_company_shortcut")
+        conn.execute("CREATE INDEX IF NOT EXISTS templates_company_key ON templates (companyKey, shortcut)")
+
+
+def encode_file_signature(signature):
+    return None if signature is None else f"{signature[0]}:{signature[1]}"
+
+
+def read_sync_state(conn, table):
+    row = conn.execute("SELECT signature, dirty FROM sync_state WHERE name = ?", (table,)).fetchone()
+    return (None, 0) if row is None else row
+
+
+def record_content_db_sync(conn, table, path):
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO sync_state (name, signature, dirty) VALUES (?, ?, 0)",
+            (table, encode_file_signature(file_signature(path))),
+        )
+
+
+def mark_content_db_dirty(conn, table):
+    conn.execute(
+        "INSERT INTO sync_state (name, dirty) VALUES (?, 1) ON CONFLICT (name) DO UPDATE SET dirty = 1",
+        (table,),
+    )
+
+
+def seed_content_db(conn, folder, metrics=None, keep_dirty=False):
+    # The JSON files can be rewritten by imports that bypass the database; any
+    # clean table whose file no longer matches the last sync is rebuilt from
+    # the file. A dirty table either wins (export) or is a conflict (import).
+    if metrics is None:
+        metrics = ImportMetrics()
+    for table, name in CONTENT_DB_SOURCES:
+        path = folder / name
+        current = encode_file_signature(file_signature(path))
+        if current is None:
+            continue
+        signature, dirty = read_sync_state(conn, table)
+        if signature == current:
+            continue
+        if dirty and keep_dirty:
+            continue
+        if dirty:
+            raise ValueError(
+                f"{name} changed outside {CONTENT_DB_NAME}, which also has unexported changes. "
+                f"Run export-db to keep the database copy, or delete {CONTENT_DB_NAME} to rebuild it from {name}."
+            )
+        with conn:
+            if table == "scenarios":
+                conn.execute("DELETE FROM scenarios")
+                db_upsert_scenarios(conn, load_flat_scenarios(path), metrics)
+            else:
+                db_replace_templates(conn, convert_template_container_to_list(read_json_object(path)))
+        metrics.count(f"db_seeded_{table}", 1)
+        record_content_db_sync(conn, table, path)
+
+
+def clear_content_db_table(folder, table, path):
+    if not content_db_path(folder).exists():
+        return
+    conn = sqlite3.connect(content_db_path(folder))
+    try:
+        conn.executescript(CONTENT_DB_SCHEMA)
+        with conn:
+            conn.execute(f"DELETE FROM {table}")
+        record_content_db_sync(conn, table, path)
+    finally:
+        conn.close()
+
+
+def encode_db_record(record):
+    return json_dumps_bytes(record, compact=True)
+
+
+def db_upsert_scenarios(conn, incoming, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    updated = 0
+    added = 0
+    for item in (incoming or []):
+        with metrics.stage("normalize"):
+            item_norm = normalize_scenario_record_for_storage(item)
+        incoming_id = normalize_text(item_norm.get("id", "")).strip()
+        if not incoming_id:
+            metrics.count("rows_without_id")
+        with metrics.stage("db_upsert"):
+            row = conn.execute("SELECT seq, record FROM scenarios WHERE id = ?", (incoming_id,)).fetchone() if incoming_id else None
+            if row is not None:
+                merged = merge_scenario_record(json_loads(row[1]), item_norm)
+                conn.execute(
+                    "UPDATE scenarios SET companyName = ?, record = ? WHERE seq = ?",
+                    (normalize_text(merged.get("companyName", "")).strip(), encode_db_record(merged), row[0]),
+                )
+                updated += 1
+                continue
+            conn.execute(
+                "INSERT INTO scenarios (id, companyName, record) VALUES (?, ?, ?)",
+                (incoming_id or None, normalize_text(item_norm.get("companyName", "")).strip(), encode_db_record(item_norm)),
+            )
+            added += 1
+    return updated, added
+
+
+def encode_db_template(tpl):
+    return (
+        normalize_text(tpl.get("id", "")).strip() or None,
+        normalize_text(tpl.get("companyName", "")).strip(),
+        normalize_company_key(tpl.get("companyName")),
+        normalize_shortcut(tpl.get("shortcut", "")),
+        encode_db_record(tpl),
+    )
+
+
+def db_replace_templates(conn, templates):
+    conn.execute("DELETE FROM templates")
+    conn.executemany(
+        "INSERT INTO templates (id, companyName, companyKey, shortcut, record) VALUES (?, ?, ?, ?, ?)",
+        (encode_db_template(tpl) for tpl in templates if isinstance(tpl, dict)),
+    )
+
+
+def db_find_template_by_key(conn, key):
+    # Mirrors template_merge_key: id first, then (company, shortcut) among
+    # templates without an id, then (company, name) among those without either.
+    if key[0] == "id":
+        return conn.execute("SELECT seq, record FROM templates WHERE id = ? ORDER BY seq LIMIT 1", (key[1],)).fetchone()
+    if key[0] == "shortcut":
+        return conn.execute(
+            "SELECT seq, record FROM templates WHERE id IS NULL AND companyKey = ? AND shortcut = ? ORDER BY seq LIMIT 1",
+            key[1:],
+        ).fetchone()
+    rows = conn.execute("SELECT seq, record FROM templates WHERE id IS NULL AND companyKey = ? AND shortcut = '' ORDER BY seq", (key[1],))
+    return next((row for row in rows if collapse_template_text(json_loads(row[1]).get("name")) == key[2]), None)
+
+
+def db_merge_templates(conn, incoming, replace_companies=False, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    updated = 0
+    added = 0
+    matched = set()
+    companies = set()
+    for item in (incoming or []):
+        if not isinstance(item, dict):
+            continue
+        companies.add(normalize_company_key(item.get("companyName")))
+        with metrics.stage("db_upsert"):
+            row = db_find_template_by_key(conn, template_merge_key(item))
+            if row is not None:
+                conn.execute(
+                    "UPDATE templates SET id = ?, companyName = ?, companyKey = ?, shortcut = ?, record = ? WHERE seq = ?",
+                    encode_db_template({**json_loads(row[1]), **item}) + (row[0],),
+                )
+                matched.add(row[0])
+                updated += 1
+                continue
+            cursor = conn.execute("INSERT INTO templates (id, companyName, companyKey, shortcut, record) VALUES (?, ?, ?, ?, ?)", encode_db_template(item))
+            matched.add(cursor.lastrowid)
+            added += 1
+    removed = 0
+    if replace_companies:
+        with metrics.stage("db_upsert"):
+            for company_key in companies:
+                stale = [(seq,) for (seq,) in conn.execute("SELECT seq FROM templates WHERE companyKey = ?", (company_key,)) if seq not in matched]
+                conn.executemany("DELETE FROM templates WHERE seq = ?", stale)
+                removed += len(stale)
+    return {"updated": updated, "added": added, "removed": removed}
+
+
+def db_load_scenarios(conn):
+    return [json_loads(record) for (record,) in conn.execute("SELECT record FROM scenarios ORDER BY seq")]
+
+
+def db_load_templates(conn):
+    return [json_loads(record) for (record,) in conn.execute("SELECT record FROM templates ORDER BY seq")]
+
+
+def db_get_scenario(conn, scenario_id):
+    row = conn.execute("SELECT record FROM scenarios WHERE id = ?", (normalize_text(scenario_id).strip(),)).fetchone()
+    return json_loads(row[0]) if row is not None else None
+
+
+def db_company_scenarios(conn, company_name):
+    rows = conn.execute("SELECT record FROM scenarios WHERE companyName = ? ORDER BY seq", (normalize_text(company_name).strip(),))
+    return [json_loads(record) for (record,) in rows]
+
+
+def db_find_templates_by_shortcut(conn, company_name, shortcut):
+    rows = conn.execute(
+        "SELECT record FROM templates WHERE companyKey = ? AND shortcut = ? ORDER BY seq",
+        (normalize_company_key(company_name), normalize_shortcut(shortcut)),
+    )
+    return [json_loads(record) for (record,) in rows]
+
+
+def iter_incoming_scenarios(src, workers=None, cache=None, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    if src.suffix.lower() == ".csv":
+        if workers is None:
+            workers = resolve_import_workers(src)
+        yield from iter_converted_csv_chunks(src, workers=workers, cache=cache, metrics=metrics)
+        return
+    with metrics.stage("json_parse"):
+        incoming_list = convert_scenario_container_to_list(json_loads(src.read_bytes()))
+    if not incoming_list:
+        raise ValueError("No scenarios found in selected file.")
+    yield incoming_list
+
+
+def import_scenarios_into_db(conn, src, progress=None, workers=None, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    updated = 0
+    added = 0
+    cache = CompanyFieldCache()
+    mark_content_db_dirty(conn, "scenarios")
+    for incoming in iter_incoming_scenarios(src, workers, cache, metrics):
+        chunk_updated, chunk_added = db_upsert_scenarios(conn, incoming, metrics)
+        updated += chunk_updated
+        added += chunk_added
+        if progress is not None:
+            progress.add_rows(len(incoming))
+    result = {"updated": updated, "added": added}
+    if src.suffix.lower() == ".csv":
+        result["cache"] = cache.stats()
+    return result
+
+
+def export_content_db(folder, progress=None, publish=False, shard=False, profiles=False, intern=False, index=True, metrics=None, search_index=False):
+    if metrics is None:
+        metrics = ImportMetrics()
+    with closing(open_content_db(folder, metrics, keep_dirty=True)) as conn:
+        with metrics.stage("db_read"):
+            scenarios = db_load_scenarios(conn)
+            templates = db_load_templates(conn)
+        write_scenarios_output(folder / "scenarios.json", {"scenarios": scenarios}, progress, publish, shard, metrics, profiles, intern)
+        record_content_db_sync(conn, "scenarios", folder / "scenarios.json")
+        write_templates_output(folder / "templates.json", {"templates": templates}, progress, publish, shard, metrics, index, search_index)
+        record_content_db_sync(conn, "templates", folder / "templates.json")
+    return {"scenarios": len(scenarios), "templates": len(templates), "metrics": metrics}
+
+
+def clear_scenarios_output(dest, progress=None, publish=False, shard=False):
+    written = write_scenarios_output(dest, {"scenarios": []}, progress, publish, shard)
+    clear_content_db_table(dest.parent, "scenarios", dest)
+    dest.with_suffix(SCENARIO_JSONL_SUFFIX).unlink(missing_ok=True)
+    jsonl_sync_path(dest.with_suffix(SCENARIO_JSONL_SUFFIX)).unlink(missing_ok=True)
+    return written
+
+
+def clear_templates_output(dest, progress=None, publish=False, shard=False):
+    written = write_templates_output(dest, {"templates": []}, progress, publish, shard)
+    clear_content_db_table(dest.parent, "templates", dest)
+    return written
+
+
+def collapse_template_text(value):
+    return re.sub(r"\s+", " ", normalize_text(value)).strip().casefold()
+
+
+def template_dedup_key(template):
+    parts = [
+        normalize_company_key(template.get("companyName")),
+        collapse_template_text(template.get("name")),
+        collapse_template_text(template.get("content")),
+        normalize_shortcut(template.get("shortcut", "")),
+    ]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def dedupe_templates(templates):
+    seen = {}
+    result = []
+    dropped = []
+    for tpl in templates:
+        if not isinstance(tpl, dict):
+            result.append(tpl)
+            continue
+        key = template_dedup_key(tpl)
+        if key in seen:
+            dropped.append({
+                "id": normalize_text(tpl.get("id", "")).strip(),
+                "keptId": normalize_text(seen[key].get("id", "")).strip(),
+                "companyName": normalize_text(tpl.get("companyName", "")).strip(),
+                "name": normalize_text(tpl.get("name", "")).strip(),
+            })
+            continue
+        seen[key] = tpl
+        result.append(tpl)
+    return result, dropped
+
+
+def dedupe_template_payload(payload):
+    if isinstance(payload, list):
+        return dedupe_templates(payload)
+    if isinstance(payload, dict) and isinstance(payload.get("templates"), list):
+        templates, dropped = dedupe_templates(payload["templates"])
+        return {**payload, "templates": templates}, dropped
+    return payload, []
+
+
+def describe_dropped_duplicates(dropped):
+    lines = []
+    for item in dropped[:DROPPED_DUPLICATES_SHOWN]:
+        company = item["companyName"] or "(global)"
+        lines.append(f"  {company} '{item['name']}': dropped {item['id'] or '(no id)'}, kept {item['keptId'] or '(no id)'}")
+    if len(dropped) > DROPPED_DUPLICATES_SHOWN:
+        lines.append(f"  ... and {len(dropped) - DROPPED_DUPLICATES_SHOWN} more")
+    return "\n".join(lines)
+
+
+def template_merge_key(template):
+    template_id = normalize_text(template.get("id", "")).strip()
+    if template_id:
+        return ("id", template_id)
+    company_key = normalize_company_key(template.get("companyName"))
+    shortcut = normalize_text(template.get("shortcut", "")).strip().lower()
+    if shortcut:
+        return ("shortcut", company_key, shortcut)
+    return ("name", company_key, collapse_template_text(template.get("name")))
+
+
+def merge_templates_by_key(existing, incoming, replace_companies=False):
+    result = list(existing or [])
+    key_to_index = {}
+    for i, item in enumerate(result):
+        if isinstance(item, dict):
+            key_to_index.setdefault(template_merge_key(item), i)
+
+    updated = 0
+    added = 0
+    matched = set()
+    companies = set()
+    for item in (incoming or []):
+        if not isinstance(item, dict):
+            continue
+        companies.add(normalize_company_key(item.get("companyName")))
+        key = template_merge_key(item)
+        if key in key_to_index:
+            idx = key_to_index[key]
+            result[idx] = {**result[idx], **item}
+            matched.add(idx)
+            updated += 1
+            continue
+        result.append(item)
+        key_to_index[key] = len(result) - 1
+        matched.add(len(result) - 1)
+        added += 1
+
+    if not replace_companies:
+        return {"templates": result, "updated": updated, "added": added, "removed": 0}
+    kept = []
+    removed = 0
+    for i, item in enumerate(result):
+        if i not in matched and isinstance(item, dict) and normalize_company_key(item.get("companyName")) in companies:
+            removed += 1
+            continue
+        kept.append(item)
+    return {"templates": kept, "updated": updated, "added": added, "removed": removed}
+
+
+def read_templates_csv(src, progress=None, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    templates = []
+    chunks = iter_chunks(iter_csv_rows(src), IMPORT_CHUNK_SIZE)
+    while True:
+        with metrics.stage("csv_decode"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        with metrics.stage("convert"):
+            templates.extend(convert_csv_rows_to_templates(chunk, metrics))
+        if progress is not None:
+            progress.add_rows(len(chunk))
+    return templates
+
+
+def convert_csv_rows_to_templates(rows, metrics):
+    templates = []
+    for row in rows:
+        name = next((normalize_text(row.get(k)).strip() for k in ["TEMPLATE_TITLE", "TEMPLATE_NAME", "NAME", "TEMPLATE", "TITLE"] if normalize_text(row.get(k)).strip()), "")
+        content = next((normalize_text(row.get(k)).strip() for k in ["TEMPLATE_TEXT", "CONTENT", "TEMPLATE_CONTENT", "BODY", "TEXT", "MESSAGE"] if normalize_text(row.get(k)).strip()), "")
+        shortcut = next((normalize_text(row.get(k)).strip() for k in ["SHORTCUT", "CODE", "KEYWORD"] if normalize_text(row.get(k)).strip()), "")
+        company = next((normalize_text(row.get(k)).strip() for k in ["COMPANY_NAME", "COMPANY", "BRAND"] if normalize_text(row.get(k)).strip()), "")
+        template_id = next((normalize_text(row.get(k)).strip() for k in ["TEMPLATE_ID", "ID"] if normalize_text(row.get(k)).strip()), "")
+
+        if not name or not content:
+            metrics.count("rows_skipped")
+            continue
+        tpl = {"name": name, "content": content}
+        if template_id:
+            tpl["id"] = template_id
+        if shortcut:
+            tpl["shortcut"] = shortcut
+        if company:
+            tpl["companyName"] = company
+        templates.append(tpl)
+    return templates
+
+
+def import_templates_file(src, dest, progress=None, publish=False, shard=False, dedupe=True, merge=False, index=True, db=False, export=True, replace_companies=False, search_index=False):
+    metrics = ImportMetrics()
+    metrics.count("rows_skipped", 0)
+    if src.suffix.lower() == ".csv":
+        payload = {"templates": read_templates_csv(src, progress, metrics)}
+        source = "csv"
+    else:
+        with metrics.stage("json_parse"):
+            payload = json_loads(src.read_bytes())
+        source = "json"
+    dropped = []
+    if dedupe:
+        with metrics.stage("dedupe"):
+            payload, dropped = dedupe_template_payload(payload)
+    result = {"source": source, "duplicates": len(dropped), "droppedDuplicates": dropped, "metrics": metrics, "target": CONTENT_DB_NAME if db and not export else dest.name}
+    with closing(open_content_db(dest.parent, metrics)) if db else nullcontext(None) as conn:
+        if merge and not db:
+            with metrics.stage("read_existing"):
+                existing_obj = read_json_object(dest)
+            with metrics.stage("merge"):
+                merged = merge_templates_by_key(convert_template_container_to_list(existing_obj), convert_template_container_to_list(payload), replace_companies)
+            payload = {**existing_obj, "templates": merged["templates"]} if isinstance(existing_obj, dict) else {"templates": merged["templates"]}
+            result.update(added=merged["added"], updated=merged["updated"], removed=merged["removed"])
+        if progress is not None:
+            progress.check_cancelled()
+        if not db:
+            shortcut_table = write_templates_output(dest, payload, progress, publish, shard, metrics, index, search_index)
+        else:
+            with conn:
+                with metrics.stage("db_write"):
+                    mark_content_db_dirty(conn, "templates")
+                    if merge:
+                        merged = db_merge_templates(conn, convert_template_container_to_list(payload), replace_companies, metrics)
+                        result.update(merged)
+                    else:
+                        db_replace_templates(conn, convert_template_container_to_list(payload))
+                if merge:
+                    with metrics.stage("read_existing"):
+                        payload = {"templates": db_load_templates(conn)}
+                if export:
+                    shortcut_table = write_templates_output(dest, payload, progress, publish, shard, metrics, index, search_index)
+                elif progress is not None:
+                    progress.check_cancelled()
+            if export:
+                record_content_db_sync(conn, "templates", dest)
+            else:
+                shortcut_table = build_shortcut_table(convert_template_container_to_list(payload))
+    result["count"] = get_template_count(payload)
+    result["shortcutCollisions"] = shortcut_table["collisions"]
+    return result
+
+
+def import_scenarios_file(src, dest, progress=None, publish=False, shard=False, workers=None, profiles=False, intern=False, db=False, export=True, jsonl=False):
+    if db and jsonl:
+        raise ValueError(f"{CONTENT_DB_NAME} and {dest.with_suffix(SCENARIO_JSONL_SUFFIX).name} storage cannot be combined.")
+    metrics = ImportMetrics()
+    metrics.count("rows_skipped", 0)
+    metrics.count("unparseable_json_cells", 0)
+    category_keys = get_category_key_cache_stats()
+    if jsonl:
+        store = dest.with_suffix(SCENARIO_JSONL_SUFFIX)
+        sync_jsonl_store(store, dest, metrics)
+        # A cancelled or failed export cuts the append back off, so the store
+        # and scenarios.json still agree afterwards.
+        checkpoint = (store.stat().st_size, read_jsonl_sync(store))
+        try:
+            merged = import_scenarios_into_jsonl(src, dest, store, progress, workers, metrics)
+            if export and (profiles or intern or shard):
+                with metrics.stage("read_existing"):
+                    scenarios = read_jsonl_scenarios(store)
+                write_scenarios_output(dest, {"scenarios": scenarios}, progress, publish, shard, metrics, profiles, intern)
+            elif export:
+                write_jsonl_as_json(store, dest, progress, publish, metrics)
+                merged["streamed"] = True
+        except BaseException:
+            restore_jsonl_checkpoint(store, checkpoint)
+            raise
+        if export:
+            record_jsonl_sync(store, dest)
+        merged["target"] = dest.name if export else store.name
+    elif db:
+        # The export runs inside the upsert transaction, so cancelling it (or
+        # a failed write) rolls content.db back along with scenarios.json.
+        with closing(open_content_db(dest.parent, metrics)) as conn:
+            with conn:
+                merged = import_scenarios_into_db(conn, src, progress, workers, metrics)
+                if export:
+                    with metrics.stage("db_read"):
+                        scenarios = db_load_scenarios(conn)
+                    write_scenarios_output(dest, {"scenarios": scenarios}, progress, publish, shard, metrics, profiles, intern)
+                elif progress is not None:
+                    progress.check_cancelled()
+            if export:
+                record_content_db_sync(conn, "scenarios", dest)
+        merged["target"] = dest.name if export else CONTENT_DB_NAME
+    else:
+        merged = import_scenarios_into_json(src, dest, progress, workers, metrics)
+    if "scenarios" in merged:
+        write_scenarios_output(dest, {"scenarios": merged["scenarios"]}, progress, publish, shard, metrics, profiles, intern)
+    if profiles and "company_profiles" in metrics.counters:
+        merged["profiles"] = metrics.counters["company_profiles"]
+    if intern and "interned_bodies" in metrics.counters:
+        merged["interned"] = {
+            "bodies": metrics.counters["interned_bodies"],
+            "references": metrics.counters["interned_references"],
+            "bytesSaved": metrics.counters["interned_bytes_saved"],
+        }
+    count_category_key_cache(metrics, category_keys)
+    merged["metrics"] = metrics
+    return merged
+
+
+def import_scenarios_into_jsonl(src, dest, store, progress=None, workers=None, metrics=None):
+    # Each chunk is merged against the store's current line for its ids and
+    # appended straight away, so memory holds one chunk plus an id -> offset
+    # index instead of the store or the whole import.
+    if metrics is None:
+        metrics = ImportMetrics()
+    sync_jsonl_store(store, dest, metrics)
+    with metrics.stage("jsonl_scan"):
+        offsets = index_jsonl_offsets(store)
+    cache = CompanyFieldCache()
+    rows = 0
+    updated = 0
+    dirty = False
+    with store.open("rb") as reader:
+        for incoming in iter_incoming_scenarios(src, workers, cache, metrics):
+            pending = []
+            chunk_ids = {}
+            for item in incoming:
+                with metrics.stage("normalize"):
+                    item_norm = normalize_scenario_record_for_storage(item)
+                sid = scenario_record_id(item_norm)
+                rows += 1
+                if not sid:
+                    metrics.count("rows_without_id")
+                    pending.append(item_norm)
+                    continue
+                if sid in chunk_ids:
+                    pending[chunk_ids[sid]] = merge_scenario_record(pending[chunk_ids[sid]], item_norm)
+                    updated += 1
+                    continue
+                if sid in offsets:
+                    with metrics.stage("merge"):
+                        item_norm = merge_scenario_record(read_jsonl_record(reader, offsets[sid]), item_norm)
+                    updated += 1
+                chunk_ids[sid] = len(pending)
+                pending.append(item_norm)
+            if progress is not None:
+                progress.add_rows(len(incoming))
+            if not dirty:
+                mark_jsonl_dirty(store, dest)
+                dirty = True
+            with metrics.stage("jsonl_append"):
+                appended = append_jsonl_records(store, pending, metrics)
+            for sid, index in chunk_ids.items():
+                offsets[sid] = appended[index]
+    result = {"added": rows - updated, "updated": updated}
+    if src.suffix.lower() == ".csv":
+        result["cache"] = cache.stats()
+    return result
+
+
+def import_scenarios_into_json(src, dest, progress=None, workers=None, metrics=None):
+    if metrics is None:
+        metrics = ImportMetrics()
+    with metrics.stage("read_existing"):
+        existing_list = load_flat_scenarios(dest)
+
+    if src.suffix.lower() == ".csv":
+        if workers is None:
+            workers = resolve_import_workers(src)
+        merged = stream_merge_csv_scenarios(existing_list, src, incremental=True, workers=workers, progress=progress, metrics=metrics)
+    else:
+        with metrics.stage("json_parse"):
+            parsed = json_loads(src.read_bytes())
+        incoming_list = convert_scenario_container_to_list(parsed)
+        if not incoming_list:
+            raise ValueError("No scenarios found in selected file.")
+        merged = merge_scenarios_by_id(existing_list, incoming_list, incremental=True, metrics=metrics)
+        if progress is not None:
+            progress.add_rows(len(incoming_list))
+    merged["target"] = dest.name
+    return merged
+
+
+def describe_scenario_import(src, merged):
+    source = "CSV" if src.suffix.lower() == ".csv" else src.name
+    message = f"{merged.get('target', 'scenarios.json')} updated from {source}. Added: {merged['added']}, Updated: {merged['updated']}."
+    if "profiles" in merged:
+        message += f" Company profiles: {merged['profiles']} ({COMPANY_PROFILES_STEM}.<hash>.json)."
+    if "interned" in merged:
+        interned = merged["interned"]
+        message += f" Interned {interned['references']} message(s) into {interned['bodies']} shared bodies ({MESSAGE_TABLE_STEM}.<hash>.json, ~{interned['bytesSaved'] / 1024:,.0f} KB saved)."
+    if merged.get("streamed"):
+        message += f" Streamed through {SCENARIO_JSONL_SUFFIX[1:]} storage; memory stays at one chunk of rows."
+    elif merged.get("target", "").endswith(SCENARIO_JSONL_SUFFIX):
+        message += " scenarios.json was not regenerated; run compact-scenarios --export to publish it."
+    if "cache" in merged:
+        message += f" Company field cache hit rate: {merged['cache']['hitRate']:.1%}."
+    if "metrics" in merged:
+        counters = merged["metrics"].counters
+        lookups = counters.get("category_key_cache_hits", 0) + counters.get("category_key_cache_misses", 0)
+        if lookups:
+            message += f" Category key cache hit rate: {counters['category_key_cache_hits'] / lookups:.1%}."
+    if "metrics" in merged:
+        message += f"\n{merged['metrics'].summary()}"
+    return message
+
+
+def describe_template_import(src, result):
+    source = "CSV" if result["source"] == "csv" else src.name
+    message = f"{result.get('target', 'templates.json')} updated from {source} ({result['count']} template(s), {result['duplicates']} duplicate(s) collapsed)."
+    if "added" in result:
+        message += f" Added: {result['added']}, Updated: {result['updated']}."
+        if result["removed"]:
+            message += f" Removed: {result['removed']}."
+    if result.get("droppedDuplicates"):
+        message += f"\n{describe_dropped_duplicates(result['droppedDuplicates'])}"
+    if result.get("shortcutCollisions"):
+        message += f"\n{describe_shortcut_collisions(result['shortcutCollisions'])}"
+    if "metrics" in result:
+        message += f"\n{result['metrics'].summary()}"
+    return message
+
+
+def report_import(operation, src, result, describe):
+    emit_metrics_line(result["metrics"], operation=operation, source=str(src))
+    return describe(src, result)
+
+
 class ContentManagerMacApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Scenario & Template Manager (macOS)")
-        self.root.geometry("780x430")
-        self.root.minsize(740, 400)
+        self.root.geometry("780x500")
+        self.root.minsize(740, 470)
 
         script_path = Path(__file__).resolve()
         self.current_folder = resolve_default_working_folder(script_path)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.active_task = None
+        self.action_buttons = []
+        self.watcher = FolderWatcher([self.scenarios_path(), self.templates_path()])
 
         self.build_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.refresh_meta()
+        self.root.after(WATCH_INTERVAL_MS, self.check_folder_changes)
 
     def scenarios_path(self):
         return self.current_folder / "scenarios.json"
@@ -504,6 +2645,7 @@ class ContentManagerMacApp:
 
         choose_btn = tk.Button(top, text="Choose Folder", width=14, command=self.choose_folder)
         choose_btn.grid(row=0, column=1, sticky="e", padx=(8, 0))
+        self.action_buttons.append(choose_btn)
         top.grid_columnconfigure(0, weight=1)
 
         self.folder_label = tk.Label(top, text=f"Folder: {self.current_folder}", anchor="w")
@@ -516,37 +2658,137 @@ class ContentManagerMacApp:
         scenarios_box.grid(row=0, column=0, sticky="nsew", padx=(0, 8))
         self.scenarios_meta = tk.Label(scenarios_box, text="Items: 0")
         self.scenarios_meta.pack(anchor="w", pady=(0, 8))
-        tk.Button(scenarios_box, text="Upload JSON / CSV", width=18, command=self.import_scenarios).pack(side="left")
-        tk.Button(scenarios_box, text="Clear Scenarios", width=18, command=self.clear_scenarios).pack(side="left", padx=8)
+        scenario_options = tk.Frame(scenarios_box)
+        scenario_options.pack(side="bottom", fill="x", pady=(8, 0))
+        upload_scenarios_btn = tk.Button(scenarios_box, text="Upload JSON / CSV", width=18, command=self.import_scenarios)
+        upload_scenarios_btn.pack(side="left")
+        clear_scenarios_btn = tk.Button(scenarios_box, text="Clear Scenarios", width=18, command=self.clear_scenarios)
+        clear_scenarios_btn.pack(side="left", padx=8)
 
         templates_box = tk.LabelFrame(middle, text="Templates", padx=10, pady=10)
         templates_box.grid(row=0, column=1, sticky="nsew", padx=(8, 0))
         self.templates_meta = tk.Label(templates_box, text="Items: 0")
         self.templates_meta.pack(anchor="w", pady=(0, 8))
-        tk.Button(templates_box, text="Upload JSON / CSV", width=18, command=self.import_templates).pack(side="left")
-        tk.Button(templates_box, text="Clear Templates", width=18, command=self.clear_templates).pack(side="left", padx=8)
+        template_options = tk.Frame(templates_box)
+        template_options.pack(side="bottom", fill="x", pady=(8, 0))
+        upload_templates_btn = tk.Button(templates_box, text="Upload JSON / CSV", width=18, command=self.import_templates)
+        upload_templates_btn.pack(side="left")
+        clear_templates_btn = tk.Button(templates_box, text="Clear Templates", width=18, command=self.clear_templates)
+        clear_templates_btn.pack(side="left", padx=8)
+        self.shard_scenarios_var = tk.BooleanVar(value=False)
+        shard_scenarios_check = tk.Checkbutton(scenario_options, text="Shard + index", variable=self.shard_scenarios_var)
+        shard_scenarios_check.pack(side="left")
+        self.profiles_var = tk.BooleanVar(value=False)
+        profiles_check = tk.Checkbutton(scenario_options, text="Company profiles", variable=self.profiles_var)
+        profiles_check.pack(side="left")
+        self.intern_var = tk.BooleanVar(value=False)
+        intern_check = tk.Checkbutton(scenario_options, text="Intern system msgs", variable=self.intern_var)
+        intern_check.pack(side="left")
+        self.shard_templates_var = tk.BooleanVar(value=False)
+        shard_templates_check = tk.Checkbutton(template_options, text="Shard by company", variable=self.shard_templates_var)
+        shard_templates_check.pack(side="left")
+        self.merge_templates_var = tk.BooleanVar(value=False)
+        merge_templates_check = tk.Checkbutton(template_options, text="Merge", variable=self.merge_templates_var)
+        merge_templates_check.pack(side="left")
+        self.dedupe_templates_var = tk.BooleanVar(value=True)
+        dedupe_templates_check = tk.Checkbutton(template_options, text="Dedupe", variable=self.dedupe_templates_var)
+        dedupe_templates_check.pack(side="left")
+        self.action_buttons.extend([upload_scenarios_btn, clear_scenarios_btn, upload_templates_btn, clear_templates_btn, shard_scenarios_check, profiles_check, intern_check, shard_templates_check, merge_templates_check, dedupe_templates_check])
 
         middle.grid_columnconfigure(0, weight=1)
         middle.grid_columnconfigure(1, weight=1)
 
         actions = tk.Frame(self.root, padx=16, pady=6)
         actions.pack(fill="x")
-        tk.Button(actions, text="Open Current Folder", width=20, command=self.open_current_folder).pack(anchor="w")
+        tk.Button(actions, text="Open Current Folder", width=20, command=self.open_current_folder).pack(side="left")
+        self.publish_var = tk.BooleanVar(value=False)
+        publish_check = tk.Checkbutton(actions, text="Publish compact + .gz/.br", variable=self.publish_var)
+        publish_check.pack(side="left", padx=8)
+        self.db_var = tk.BooleanVar(value=False)
+        db_check = tk.Checkbutton(actions, text=f"Store in {CONTENT_DB_NAME}", variable=self.db_var)
+        db_check.pack(side="left")
+        self.action_buttons.extend([publish_check, db_check])
+        self.cancel_btn = tk.Button(actions, text="Cancel", width=12, command=self.cancel_task, state="disabled")
+        self.cancel_btn.pack(side="right")
+        self.progress_label = tk.Label(actions, text="", anchor="e")
+        self.progress_label.pack(side="right", padx=8)
 
         status_group = tk.LabelFrame(self.root, text="Status", padx=10, pady=10)
         status_group.pack(fill="both", expand=True, padx=16, pady=(8, 14))
-        self.status_text = tk.Text(status_group, height=4, wrap="word", state="disabled")
+        self.status_text = tk.Text(status_group, height=6, wrap="word", state="disabled")
         self.status_text.pack(fill="both", expand=True)
         self.set_status("Ready.")
 
+    def set_busy(self, busy):
+        for button in self.action_buttons:
+            button.config(state="disabled" if busy else "normal")
+        self.cancel_btn.config(state="normal" if busy else "disabled")
+
+    def run_task(self, description, job, on_success, error_prefix):
+        if self.active_task is not None:
+            self.set_status("Another operation is still running.", is_error=True)
+            return
+        progress = OperationProgress()
+        future = self.executor.submit(job, progress)
+        self.active_task = (future, progress, on_success, error_prefix)
+        self.set_busy(True)
+        self.set_status(f"{description}...")
+        self.root.after(TASK_POLL_MS, self.poll_task)
+
+    def poll_task(self):
+        future, progress, on_success, error_prefix = self.active_task
+        self.progress_label.config(text=progress.describe())
+        if not future.done():
+            self.root.after(TASK_POLL_MS, self.poll_task)
+            return
+        self.active_task = None
+        self.set_busy(False)
+        self.watcher.reset()
+        try:
+            result = future.result()
+        except OperationCancelled:
+            self.set_status("Operation cancelled. No files were changed.")
+            return
+        except Exception as exc:
+            self.set_status(f"{error_prefix}: {exc}", is_error=True)
+            self.refresh_meta()
+            return
+        self.set_status(on_success(result))
+        self.refresh_meta()
+
+    def cancel_task(self):
+        if self.active_task is None:
+            return
+        self.active_task[1].cancel()
+        self.set_status("Cancelling...")
+
+    def on_close(self):
+        if self.active_task is not None:
+            self.active_task[1].cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
     def refresh_meta(self):
+        future = self.executor.submit(read_content_counts, self.scenarios_path(), self.templates_path())
+        self.root.after(TASK_POLL_MS, self.apply_meta, future)
+
+    def apply_meta(self, future):
+        if not future.done():
+            self.root.after(TASK_POLL_MS, self.apply_meta, future)
+            return
         try:
-            scenarios_json = read_json_object(self.scenarios_path())
-            templates_json = read_json_object(self.templates_path())
-            self.scenarios_meta.config(text=f"Items: {get_scenario_count(scenarios_json)}")
-            self.templates_meta.config(text=f"Items: {get_template_count(templates_json)}")
+            scenario_count, template_count = future.result()
         except Exception as exc:
             self.set_status(f"Failed to read JSON files: {exc}", is_error=True)
+            return
+        self.scenarios_meta.config(text=f"Items: {scenario_count}")
+        self.templates_meta.config(text=f"Items: {template_count}")
+
+    def check_folder_changes(self):
+        if self.active_task is None and self.watcher.changed():
+            self.refresh_meta()
+            self.set_status("Detected changes on disk; counts refreshed.")
+        self.root.after(WATCH_INTERVAL_MS, self.check_folder_changes)
 
     def choose_folder(self):
         selected = filedialog.askdirectory(initialdir=str(self.current_folder))
@@ -554,6 +2796,7 @@ class ContentManagerMacApp:
             return
         self.current_folder = Path(selected)
         self.folder_label.config(text=f"Folder: {self.current_folder}")
+        self.watcher.reset([self.scenarios_path(), self.templates_path()])
         self.refresh_meta()
         self.set_status(f"Connected folder: {self.current_folder}")
 
@@ -569,40 +2812,20 @@ class ContentManagerMacApp:
         )
         if not file_path:
             return
-        try:
-            src = Path(file_path)
-            if src.suffix.lower() == ".csv":
-                templates = []
-                with src.open("r", encoding="utf-8-sig", newline="") as fh:
-                    rows = csv.DictReader(fh)
-                    for row in rows:
-                        name = next((normalize_text(row.get(k)).strip() for k in ["TEMPLATE_TITLE", "TEMPLATE_NAME", "NAME", "TEMPLATE", "TITLE"] if normalize_text(row.get(k)).strip()), "")
-                        content = next((normalize_text(row.get(k)).strip() for k in ["TEMPLATE_TEXT", "CONTENT", "TEMPLATE_CONTENT", "BODY", "TEXT", "MESSAGE"] if normalize_text(row.get(k)).strip()), "")
-                        shortcut = next((normalize_text(row.get(k)).strip() for k in ["SHORTCUT", "CODE", "KEYWORD"] if normalize_text(row.get(k)).strip()), "")
-                        company = next((normalize_text(row.get(k)).strip() for k in ["COMPANY_NAME", "COMPANY", "BRAND"] if normalize_text(row.get(k)).strip()), "")
-                        template_id = next((normalize_text(row.get(k)).strip() for k in ["TEMPLATE_ID", "ID"] if normalize_text(row.get(k)).strip()), "")
-
-                        if not name or not content:
-                            continue
-                        tpl = {"name": name, "content": content}
-                        if template_id:
-                            tpl["id"] = template_id
-                        if shortcut:
-                            tpl["shortcut"] = shortcut
-                        if company:
-                            tpl["companyName"] = company
-                        templates.append(tpl)
-                write_json_object(self.templates_path(), {"templates": templates})
-                self.refresh_meta()
-                self.set_status(f"templates.json updated from CSV ({len(templates)} template(s)).")
-                return
-
-            parsed = json.loads(src.read_text(encoding="utf-8"))
-            write_json_object(self.templates_path(), parsed)
-            self.refresh_meta()
-            self.set_status(f"templates.json updated from {src.name}.")
-        except Exception as exc:
-            self.set_status(f"Invalid JSON for templates.json: {exc}", is_error=True)
+        src = Path(file_path)
+        dest = self.templates_path()
+        publish = self.publish_var.get()
+        shard = self.shard_templates_var.get()
+        merge = self.merge_templates_var.get()
+        dedupe = self.dedupe_templates_var.get()
+        db = self.db_var.get()
+
+        self.run_task(
+            f"Importing templates from {src.name}",
+            lambda progress: import_templates_file(src, dest, progress, publish, shard, dedupe=dedupe, merge=merge, db=db),
+            lambda result: report_import("import-templates", src, result, describe_template_import),
+            "Invalid JSON for templates.json",
+        )
 
     def import_scenarios(self):
         file_path = filedialog.askopenfilename(
@@ -616,53 +2839,51 @@ class ContentManagerMacApp:
         )
         if not file_path:
             return
-        try:
-            existing_obj = read_json_object(self.scenarios_path())
-            existing_list = convert_scenario_container_to_list(existing_obj)
-
-            src = Path(file_path)
-            if src.suffix.lower() == ".csv":
-                incoming = []
-                with src.open("r", encoding="utf-8-sig", newline="") as fh:
-                    rows = csv.DictReader(fh)
-                    for row in rows:
-                        incoming.append(convert_csv_row_to_scenario(row))
-                merged = merge_scenarios_by_id(existing_list, incoming)
-                write_json_object(self.scenarios_path(), {"scenarios": merged["scenarios"]})
-                self.refresh_meta()
-                self.set_status(f"scenarios.json updated from CSV. Added: {merged['added']}, Updated: {merged['updated']}.")
-                return
-
-            parsed = json.loads(src.read_text(encoding="utf-8"))
-            incoming_list = convert_scenario_container_to_list(parsed)
-            if not incoming_list:
-                raise ValueError("No scenarios found in selected file.")
-            merged = merge_scenarios_by_id(existing_list, incoming_list)
-            write_json_object(self.scenarios_path(), {"scenarios": merged["scenarios"]})
-            self.refresh_meta()
-            self.set_status(f"scenarios.json updated from {src.name}. Added: {merged['added']}, Updated: {merged['updated']}.")
-        except Exception as exc:
-            self.set_status(f"Failed to import scenarios source: {exc}", is_error=True)
+        src = Path(file_path)
+        dest = self.scenarios_path()
+        publish = self.publish_var.get()
+        shard = self.shard_scenarios_var.get()
+        profiles = self.profiles_var.get()
+        intern = self.intern_var.get()
+        db = self.db_var.get()
+        # Large CSVs go through scenarios.jsonl so memory stays at one chunk;
+        # profiles, interning and shards need the whole store, so with those
+        # on scenarios.json is left for compact-scenarios --export.
+        jsonl = not db and src.suffix.lower() == ".csv" and src.stat().st_size >= LARGE_CSV_IMPORT_BYTES
+        export = not (jsonl and (profiles or intern or shard))
+
+        self.run_task(
+            f"Importing scenarios from {src.name}",
+            lambda progress: import_scenarios_file(src, dest, progress, publish, shard, profiles=profiles, intern=intern, db=db, export=export, jsonl=jsonl),
+            lambda merged: report_import("import-scenarios", src, merged, describe_scenario_import),
+            "Failed to import scenarios source",
+        )
 
     def clear_scenarios(self):
         if not messagebox.askyesno("Confirm Clear", 'Clear scenarios.json and reset it to { "scenarios": [] }?'):
             return
-        try:
-            write_json_object(self.scenarios_path(), {"scenarios": []})
-            self.refresh_meta()
-            self.set_status("scenarios.json cleared.")
-        except Exception as exc:
-            self.set_status(f"Failed to clear scenarios.json: {exc}", is_error=True)
+        dest = self.scenarios_path()
+        publish = self.publish_var.get()
+        shard = self.shard_scenarios_var.get()
+        self.run_task(
+            "Clearing scenarios.json",
+            lambda progress: clear_scenarios_output(dest, progress, publish, shard),
+            lambda _: "scenarios.json cleared.",
+            "Failed to clear scenarios.json",
+        )
 
     def clear_templates(self):
         if not messagebox.askyesno("Confirm Clear", 'Clear templates.json and reset it to { "templates": [] }?'):
             return
-        try:
-            write_json_object(self.templates_path(), {"templates": []})
-            self.refresh_meta()
-            self.set_status("templates.json cleared.")
-        except Exception as exc:
-            self.set_status(f"Failed to clear templates.json: {exc}", is_error=True)
+        dest = self.templates_path()
+        publish = self.publish_var.get()
+        shard = self.shard_templates_var.get()
+        self.run_task(
+            "Clearing templates.json",
+            lambda progress: clear_templates_output(dest, progress, publish, shard),
+            lambda _: "templates.json cleared.",
+            "Failed to clear templates.json",
+        )
 
     def open_current_folder(self):
         try:
@@ -671,11 +2892,191 @@ class ContentManagerMacApp:
             self.set_status(f"Could not open folder: {exc}", is_error=True)
 
 
-def main():
+def load_tkinter():
+    global tk, filedialog, messagebox
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+
+
+def run_gui():
+    load_tkinter()
     root = tk.Tk()
     app = ContentManagerMacApp(root)
     root.mainloop()
 
 
+def cli_import_scenarios(args):
+    src = Path(args.source)
+    merged = import_scenarios_file(
+        src,
+        args.folder / "scenarios.json",
+        publish=args.publish,
+        shard=args.shard,
+        workers=args.workers,
+        profiles=args.company_profiles,
+        intern=args.intern_messages,
+        db=args.db,
+        export=not args.no_export,
+        jsonl=args.jsonl,
+    )
+    print(report_import("import-scenarios", src, merged, describe_scenario_import))
+
+
+def cli_import_templates(args):
+    src = Path(args.source)
+    result = import_templates_file(
+        src,
+        args.folder / "templates.json",
+        publish=args.publish,
+        shard=args.shard,
+        dedupe=not args.no_dedupe,
+        merge=args.merge,
+        replace_companies=args.replace_companies,
+        index=not args.no_index,
+        search_index=args.search_index,
+        db=args.db,
+        export=not args.no_export,
+    )
+    print(report_import("import-templates", src, result, describe_template_import))
+
+
+def cli_clear(args):
+    if args.target in ("scenarios", "all"):
+        clear_scenarios_output(args.folder / "scenarios.json", publish=args.publish, shard=args.shard)
+        print("scenarios.json cleared.")
+    if args.target in ("templates", "all"):
+        clear_templates_output(args.folder / "templates.json", publish=args.publish, shard=args.shard)
+        print("templates.json cleared.")
+
+
+def cli_export_db(args):
+    if not content_db_path(args.folder).exists():
+        raise ValueError(f"No {CONTENT_DB_NAME} in {args.folder}.")
+    result = export_content_db(
+        args.folder,
+        publish=args.publish,
+        shard=args.shard,
+        profiles=args.company_profiles,
+        intern=args.intern_messages,
+        index=not args.no_index,
+        search_index=args.search_index,
+    )
+    print(f"Exported {result['scenarios']} scenario(s) and {result['templates']} template(s) from {CONTENT_DB_NAME}.\n{result['metrics'].summary()}")
+
+
+def cli_search_templates(args):
+    started = time.perf_counter()
+    results = search_templates(args.folder / "templates.json", args.query, args.company, args.limit, not args.no_global)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if args.json:
+        print(json_dumps_bytes({"query": args.query, "elapsedMs": round(elapsed_ms, 3), "results": results}).decode("utf-8"))
+        return
+    for rank, result in enumerate(results, 1):
+        company = result["companyName"] or "(global)"
+        shortcut = f" [{result['shortcut']}]" if result["shortcut"] else ""
+        print(f"{rank:>3}. {result['score']:7.2f}  {company}: {result['name']}{shortcut}  #{result['position']}")
+    print(f"{len(results)} result(s) in {elapsed_ms:.1f} ms.")
+
+
+def cli_compact_scenarios(args):
+    store = (args.folder / "scenarios.json").with_suffix(SCENARIO_JSONL_SUFFIX)
+    if not store.exists():
+        raise ValueError(f"No {store.name} in {args.folder}.")
+    result = compact_jsonl_scenarios(store)
+    print(f"{store.name} compacted: {result['lines']} line(s) -> {result['records']} record(s), {result['folded']} superseded.")
+    if not args.export:
+        return
+    dest = args.folder / "scenarios.json"
+    if export_jsonl_scenarios(store, dest):
+        print(f"{dest.name} regenerated from {store.name}.")
+    else:
+        print(f"{dest.name} changed since {store.name} was last synced and the store had no unexported changes; rebuilt {store.name} from it instead.")
+
+
+def cli_stats(args):
+    scenario_count, template_count = read_content_counts(args.folder / "scenarios.json", args.folder / "templates.json")
+    print(f"Folder: {args.folder}")
+    print(f"Scenarios: {scenario_count}")
+    print(f"Templates: {template_count}")
+
+
+def build_arg_parser():
+    default_folder = resolve_default_working_folder(Path(__file__).resolve())
+    parser = argparse.ArgumentParser(description="Scenario & Template Manager. Starts the GUI when no command is given.")
+    parser.add_argument("--folder", type=Path, default=default_folder, help="folder holding scenarios.json and templates.json")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("gui", help="start the Tk window")
+
+    scenarios = commands.add_parser("import-scenarios", help="merge a JSON or CSV source into scenarios.json")
+    scenarios.add_argument("source")
+    scenarios.add_argument("--publish", action="store_true", help="write compact JSON plus .gz/.br siblings")
+    scenarios.add_argument("--shard", action="store_true", help="also write scenarios/ chunks and index")
+    scenarios.add_argument("--workers", type=int, default=None, help="CSV conversion processes (default: by file size)")
+    scenarios.add_argument("--company-profiles", action="store_true", help=f"store notes/escalations/blocklists once per company in {COMPANY_PROFILES_STEM}.<hash>.json")
+    scenarios.add_argument("--intern-messages", action="store_true", help=f"store repeated system message bodies once in {MESSAGE_TABLE_STEM}.<hash>.json")
+    scenarios.add_argument("--db", action="store_true", help=f"upsert into {CONTENT_DB_NAME} (re-seeded from scenarios.json whenever it changed outside the database)")
+    scenarios.add_argument("--jsonl", action="store_true", help="append to scenarios.jsonl one chunk at a time so memory stays flat (re-seeded from scenarios.json whenever it changed outside the store)")
+    scenarios.add_argument("--no-export", action="store_true", help="with --db or --jsonl, skip regenerating scenarios.json")
+    scenarios.set_defaults(handler=cli_import_scenarios)
+
+    templates = commands.add_parser("import-templates", help="replace or merge templates.json from a JSON or CSV source")
+    templates.add_argument("source")
+    templates.add_argument("--publish", action="store_true", help="write compact JSON plus .gz/.br siblings")
+    templates.add_argument("--shard", action="store_true", help="also write per-company templates/ shards")
+    templates.add_argument("--merge", action="store_true", help="upsert into the existing templates instead of replacing them")
+    templates.add_argument("--replace-companies", action="store_true", help="with --merge, also drop existing templates of each imported company that the source no longer lists")
+    templates.add_argument("--no-dedupe", action="store_true", help="keep duplicate templates")
+    templates.add_argument("--no-index", action="store_true", help=f"skip writing {TEMPLATE_SEARCH_DB_NAME}")
+    templates.add_argument("--search-index", action="store_true", help=f"also write {TEMPLATE_SEARCH_INDEX_NAME}, a word-token index for external tools (the web app does not read it)")
+    templates.add_argument("--db", action="store_true", help=f"store templates in {CONTENT_DB_NAME} (re-seeded from templates.json whenever it changed outside the database)")
+    templates.add_argument("--no-export", action="store_true", help="with --db, skip regenerating templates.json")
+    templates.set_defaults(handler=cli_import_templates)
+
+    clear = commands.add_parser("clear", help="reset scenarios.json and/or templates.json")
+    clear.add_argument("target", choices=["scenarios", "templates", "all"])
+    clear.add_argument("--publish", action="store_true", help="write compact JSON plus .gz/.br siblings")
+    clear.add_argument("--shard", action="store_true", help="keep an (empty) shard directory")
+    clear.set_defaults(handler=cli_clear)
+
+    export = commands.add_parser("export-db", help=f"regenerate scenarios.json and templates.json from {CONTENT_DB_NAME}")
+    export.add_argument("--publish", action="store_true", help="write compact JSON plus .gz/.br siblings")
+    export.add_argument("--shard", action="store_true", help="also write scenarios/ and templates/ shards")
+    export.add_argument("--company-profiles", action="store_true", help=f"store notes/escalations/blocklists once per company in {COMPANY_PROFILES_STEM}.<hash>.json")
+    export.add_argument("--intern-messages", action="store_true", help=f"store repeated system message bodies once in {MESSAGE_TABLE_STEM}.<hash>.json")
+    export.add_argument("--no-index", action="store_true", help=f"skip writing {TEMPLATE_SEARCH_DB_NAME}")
+    export.add_argument("--search-index", action="store_true", help=f"also write {TEMPLATE_SEARCH_INDEX_NAME}, a word-token index for external tools (the web app does not read it)")
+    export.set_defaults(handler=cli_export_db)
+
+    search = commands.add_parser("search-templates", help=f"ranked full-text template search using {TEMPLATE_SEARCH_DB_NAME}")
+    search.add_argument("query")
+    search.add_argument("--company", default=None, help="only this company's templates (plus global ones)")
+    search.add_argument("--no-global", action="store_true", help="with --company, leave out templates without a company")
+    search.add_argument("--limit", type=int, default=SEARCH_RESULT_LIMIT)
+    search.add_argument("--json", action="store_true", help="print results with highlight offsets as JSON")
+    search.set_defaults(handler=cli_search_templates)
+
+    compact = commands.add_parser("compact-scenarios", help="rewrite scenarios.jsonl keeping only the latest line per id")
+    compact.add_argument("--export", action="store_true", help="also regenerate scenarios.json from the compacted store")
+    compact.set_defaults(handler=cli_compact_scenarios)
+
+    stats = commands.add_parser("stats", help="print scenario and template counts")
+    stats.set_defaults(handler=cli_stats)
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.command in (None, "gui"):
+        run_gui()
+        return 0
+    try:
+        args.handler(args)
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import json
+import tempfile
+import unittest
+from contextlib import closing
+from pathlib import Path
+
+import content_manager_mac as cm
+
+
+def write_json(path, value):
+    path.write_text(json.dumps(value), encoding="utf-8")
+
+
+def read_ids(path):
+    return [item["id"] for item in json.loads(path.read_text(encoding="utf-8"))["scenarios"]]
+
+
+def scenario(sid, notes=""):
+    return {"id": sid, "companyName": "Acme", "notes": notes}
+
+
+class CancelOnWrite(cm.OperationProgress):
+    def set_bytes_written(self, count, check=True):
+        self.cancel()
+        super().set_bytes_written(count, check)
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp.name)
+        self.scenarios = self.folder / "scenarios.json"
+        self.templates = self.folder / "templates.json"
+        write_json(self.scenarios, {"scenarios": [scenario("s-1"), scenario("s-2")]})
+        write_json(self.templates, {"templates": []})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def source(self, name, items, key="scenarios"):
+        path = self.folder / name
+        write_json(path, {key: items})
+        return path
+
+
+class ContentDbSyncTests(StoreTestCase):
+    def test_export_keeps_json_changed_after_seed(self):
+        tpl = {"id": "t-1", "name": "Hi", "shortcut": "hi", "content": "Hello", "companyName": "Acme"}
+        cm.import_templates_file(self.source("tpl.json", [tpl], "templates"), self.templates, db=True, index=False)
+        cm.import_scenarios_file(self.source("plain.json", [scenario("s-3")]), self.scenarios)
+        cm.export_content_db(self.folder, index=False)
+        self.assertEqual(read_ids(self.scenarios), ["s-1", "s-2", "s-3"])
+
+    def test_export_keeps_unexported_db_changes(self):
+        cm.import_scenarios_file(self.source("db.json", [scenario("s-3")]), self.scenarios, db=True, export=False)
+        cm.export_content_db(self.folder, index=False)
+        self.assertEqual(read_ids(self.scenarios), ["s-1", "s-2", "s-3"])
+
+    def test_plain_import_between_db_imports_is_kept(self):
+        cm.import_scenarios_file(self.source("a.json", [scenario("s-a")]), self.scenarios, db=True)
+        cm.import_scenarios_file(self.source("b.json", [scenario("s-b")]), self.scenarios)
+        cm.import_scenarios_file(self.source("c.json", [scenario("s-c")]), self.scenarios, db=True)
+        self.assertEqual(read_ids(self.scenarios), ["s-1", "s-2", "s-a", "s-b", "s-c"])
+
+    def test_cancelled_export_rolls_back_db(self):
+        with self.assertRaises(cm.OperationCancelled):
+            cm.import_scenarios_file(self.source("db.json", [scenario("s-3")]), self.scenarios, CancelOnWrite(), db=True)
+        self.assertEqual(read_ids(self.scenarios), ["s-1", "s-2"])
+        cm.import_scenarios_file(self.source("plain.json", [scenario("s-4")]), self.scenarios)
+        cm.import_scenarios_file(self.source("db2.json", [scenario("s-5")]), self.scenarios, db=True)
+        self.assertEqual(read_ids(self.scenarios), ["s-1", "s-2", "s-4", "s-5"])
+
+
+class JsonlSyncTests(StoreTestCase):
+    def test_compact_export_keeps_external_edit(self):
+        store = self.scenarios.with_suffix(cm.SCENARIO_JSONL_SUFFIX)
+        cm.import_scenarios_file(self.source("a.json", [scenario("s-a")]), self.scenarios, jsonl=True)
+        write_json(self.scenarios, {"scenarios": [scenario("s-1"), scenario("s-2"), scenario("s-a"), scenario("s-edit")]})
+        self.assertFalse(cm.export_jsonl_scenarios(store, self.scenarios))
+        self.assertEqual(read_ids(self.scenarios), ["s-1", "s-2", "s-a", "s-edit"])
+        self.assertEqual([item["id"] for item in cm.read_jsonl_scenarios(store)], ["s-1", "s-2", "s-a", "s-edit"])
+
+    def test_compact_export_writes_unexported_appends(self):
+        store = self.scenarios.with_suffix(cm.SCENARIO_JSONL_SUFFIX)
+        cm.import_scenarios_file(self.source("a.json", [scenario("s-a")]), self.scenarios, jsonl=True, export=False)
+        self.assertTrue(cm.export_jsonl_scenarios(store, self.scenarios))
+        self.assertEqual(read_ids(self.scenarios), ["s-1", "s-2", "s-a"])
+
+    def test_cancelled_export_cuts_append_back(self):
+        store = self.scenarios.with_suffix(cm.SCENARIO_JSONL_SUFFIX)
+        cm.import_scenarios_file(self.source("a.json", [scenario("s-a")]), self.scenarios, jsonl=True)
+        before = store.read_bytes()
+        with self.assertRaises(cm.OperationCancelled):
+            cm.import_scenarios_file(self.source("b.json", [scenario("s-b")]), self.scenarios, CancelOnWrite(), jsonl=True)
+        self.assertEqual(store.read_bytes(), before)
+        self.assertFalse(cm.read_jsonl_sync(store)["dirty"])
+        self.assertEqual(read_ids(self.scenarios), ["s-1", "s-2", "s-a"])
+
+    def test_torn_tail_is_cut_before_append(self):
+        store = self.scenarios.with_suffix(cm.SCENARIO_JSONL_SUFFIX)
+        cm.import_scenarios_file(self.source("a.json", [scenario("s-a")]), self.scenarios, jsonl=True, export=False)
+        with store.open("ab") as fh:
+            fh.write(b'{"id": "s-torn"')
+        cm.append_jsonl_records(store, [scenario("s-b")])
+        self.assertEqual([item["id"] for item in cm.read_jsonl_scenarios(store)], ["s-1", "s-2", "s-a", "s-b"])
+
+
+class SideTableTests(StoreTestCase):
+    def side_tables(self, stem):
+        return sorted(path.name for path in self.folder.glob(f"{stem}.*.json"))
+
+    def drop_pointers(self):
+        container = json.loads(self.scenarios.read_text(encoding="utf-8"))
+        write_json(self.scenarios, {"scenarios": container["scenarios"]})
+
+    def test_profiles_round_trip_and_switching_off_prunes_table(self):
+        cm.import_scenarios_file(self.source("a.json", [scenario("s-a", "shared")]), self.scenarios, profiles=True)
+        self.assertEqual(len(self.side_tables(cm.COMPANY_PROFILES_STEM)), 1)
+        self.assertEqual([item["id"] for item in cm.load_flat_scenarios(self.scenarios)], ["s-1", "s-2", "s-a"])
+        cm.import_scenarios_file(self.source("b.json", [scenario("s-b")]), self.scenarios)
+        self.assertEqual(self.side_tables(cm.COMPANY_PROFILES_STEM), [])
+
+    def test_dropped_profile_pointer_refuses_import_and_keeps_table(self):
+        cm.import_scenarios_file(self.source("a.json", [scenario("s-a")]), self.scenarios, profiles=True)
+        tables = self.side_tables(cm.COMPANY_PROFILES_STEM)
+        self.drop_pointers()
+        with self.assertRaises(ValueError):
+            cm.import_scenarios_file(self.source("b.json", [scenario("s-b")]), self.scenarios)
+        cm.clear_scenarios_output(self.scenarios)
+        self.assertEqual(self.side_tables(cm.COMPANY_PROFILES_STEM), tables)
+
+    def test_dropped_message_pointer_refuses_import_and_keeps_table(self):
+        system = {"message_type": "system", "message_text": "Welcome back"}
+        items = [{**scenario(f"s-{n}"), "conversation": [system]} for n in "ab"]
+        cm.import_scenarios_file(self.source("a.json", items), self.scenarios, intern=True)
+        tables = self.side_tables(cm.MESSAGE_TABLE_STEM)
+        self.assertEqual(len(tables), 1)
+        self.drop_pointers()
+        with self.assertRaises(ValueError):
+            cm.import_scenarios_file(self.source("b.json", [scenario("s-c")]), self.scenarios)
+        cm.clear_scenarios_output(self.scenarios)
+        self.assertEqual(self.side_tables(cm.MESSAGE_TABLE_STEM), tables)
+
+
+class TemplateOutputTests(StoreTestCase):
+    def test_search_index_is_opt_in(self):
+        tpl = {"id": "t-1", "name": "Hi", "shortcut": "hi", "content": "Hello", "companyName": "Acme"}
+        index_path = self.folder / cm.TEMPLATE_SEARCH_INDEX_NAME
+        cm.import_templates_file(self.source("tpl.json", [tpl], "templates"), self.templates, index=False, search_index=True)
+        self.assertTrue(index_path.exists())
+        cm.import_templates_file(self.source("tpl.json", [tpl], "templates"), self.templates, index=False)
+        self.assertFalse(index_path.exists())
+
+    def test_db_merge_matches_json_merge_and_keeps_untouched_rows(self):
+        existing = [
+            {"id": "t-1", "name": "One", "content": "a", "companyName": "Acme"},
+            {"name": "Hi", "shortcut": "hi", "content": "b", "companyName": "Acme"},
+            {"name": "Bye", "content": "c", "companyName": "Acme"},
+            {"name": "Other", "shortcut": "ot", "content": "d", "companyName": "Zed"},
+        ]
+        incoming = [
+            {"id": "t-1", "name": "One", "content": "a2", "companyName": "Acme"},
+            {"name": "Hi", "shortcut": "HI", "content": "b2", "companyName": "ACME"},
+            {"name": "New", "content": "e", "companyName": "Acme"},
+        ]
+        outputs = []
+        for db in (False, True):
+            write_json(self.templates, {"templates": existing})
+            if db:
+                cm.import_templates_file(self.source("seed.json", existing, "templates"), self.templates, db=True, index=False)
+                with closing(cm.open_content_db(self.folder)) as conn:
+                    before = dict(conn.execute("SELECT seq, record FROM templates WHERE companyKey = 'zed'").fetchall())
+            result = cm.import_templates_file(self.source("in.json", incoming, "templates"), self.templates, merge=True, replace_companies=True, index=False, db=db)
+            self.assertEqual((result["updated"], result["added"], result["removed"]), (2, 1, 1))
+            outputs.append(json.loads(self.templates.read_text(encoding="utf-8"))["templates"])
+        self.assertEqual(outputs[0], outputs[1])
+        with closing(cm.open_content_db(self.folder)) as conn:
+            self.assertEqual(dict(conn.execute("SELECT seq, record FROM templates WHERE companyKey = 'zed'").fetchall()), before)
+
+
+class JsonBackendTests(StoreTestCase):
+    def test_wide_integers_survive_import(self):
+        wide = 123456789012345678901234567890
+        self.scenarios.write_text(f'{{"scenarios": [{{"id": "s-1", "companyName": "Acme", "orderTotal": {wide}}}]}}', encoding="utf-8")
+        cm.import_scenarios_file(self.source("b.json", [scenario("s-2")]), self.scenarios)
+        self.assertIn(str(wide), self.scenarios.read_text(encoding="utf-8"))
+        self.assertEqual(cm.read_json_object(self.scenarios)["scenarios"][0]["orderTotal"], wide)
+
+
+class ImportMetricsTests(StoreTestCase):
+    def test_category_key_cache_lookups_are_counted_per_import(self):
+        notes = {"Tone": ["friendly"], "Escalate": ["refunds"]}
+        items = [scenario(f"s-{n}", notes) for n in "ab"]
+        runs = [cm.import_scenarios_file(self.source("a.json", items), self.scenarios)["metrics"].counters for _ in range(3)]
+        lookups = [run["category_key_cache_hits"] + run["category_key_cache_misses"] for run in runs]
+        self.assertGreater(lookups[1], 0)
+        self.assertEqual(lookups[1], lookups[2])
+        self.assertEqual(runs[2]["category_key_cache_misses"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -339,6 +339,80 @@ function Convert-ScenarioContainerToList {
     return @()
 }
 
+function Get-ScenarioSideTable {
+    param(
+        [Parameter(Mandatory = $true)][string]$ScenariosPath,
+        [Parameter(Mandatory = $true)][string]$FileName,
+        [Parameter(Mandatory = $true)][string]$Key
+    )
+
+    $path = Join-Path (Split-Path -Parent $ScenariosPath) $FileName
+    if (-not (Test-Path -LiteralPath $path)) {
+        throw "$FileName referenced by $(Split-Path -Leaf $ScenariosPath) is missing."
+    }
+    $table = Get-JsonObject -Path $path
+    if ($table.PSObject.Properties.Name -contains $Key) {
+        return $table.$Key
+    }
+    return $null
+}
+
+function Test-SideTableReference {
+    param($Value, [string]$Name)
+
+    if ($null -eq $Value -or $Value -is [string] -or $Value -is [System.Array] -or $Value -is [ValueType]) { return $false }
+    $props = @($Value.PSObject.Properties)
+    return ($props.Count -eq 1 -and $props[0].Name -eq $Name -and $props[0].Value -is [string])
+}
+
+# The Mac tool can keep per-company fields and repeated system messages in
+# companies.<hash>.json / messages.<hash>.json files named by scenarios.json; put the
+# real values back before merging, since this tool writes scenarios.json without
+# those pointers.
+function Expand-ScenarioSideTables {
+    param(
+        [Parameter(Mandatory = $true)][string]$ScenariosPath,
+        $Container,
+        [array]$Scenarios = @()
+    )
+
+    $profiles = $null
+    $messages = $null
+    if ($Container -and -not ($Container -is [System.Array])) {
+        if ($Container.companyProfiles -is [string]) {
+            $profiles = Get-ScenarioSideTable -ScenariosPath $ScenariosPath -FileName $Container.companyProfiles -Key 'companies'
+        }
+        if ($Container.messageTable -is [string]) {
+            $messages = Get-ScenarioSideTable -ScenariosPath $ScenariosPath -FileName $Container.messageTable -Key 'messages'
+        }
+    }
+
+    foreach ($item in $Scenarios) {
+        if ($null -eq $item -or $item -is [string]) { continue }
+        foreach ($p in @($item.PSObject.Properties)) {
+            if (-not (Test-SideTableReference -Value $p.Value -Name '$profile')) { continue }
+            $companyKey = $p.Value.'$profile'
+            $companyProfile = if ($profiles) { $profiles.PSObject.Properties[$companyKey] } else { $null }
+            if ($null -eq $companyProfile -or -not ($companyProfile.Value.PSObject.Properties.Name -contains $p.Name)) {
+                throw "Company profile '$companyKey' for $($p.Name) cannot be resolved; scenarios.json no longer names its companyProfiles table."
+            }
+            $item.($p.Name) = $companyProfile.Value.($p.Name)
+        }
+        if (-not ($item.PSObject.Properties.Name -contains 'conversation') -or -not ($item.conversation -is [System.Array])) { continue }
+        foreach ($msg in $item.conversation) {
+            if ($null -eq $msg -or $msg -is [string] -or -not ($msg.PSObject.Properties.Name -contains 'message_text')) { continue }
+            if (-not (Test-SideTableReference -Value $msg.message_text -Name '$message')) { continue }
+            $bodyId = $msg.message_text.'$message'
+            $body = if ($messages) { $messages.PSObject.Properties[$bodyId] } else { $null }
+            if ($null -eq $body) {
+                throw "Message body $bodyId cannot be resolved; scenarios.json no longer names its messageTable."
+            }
+            $msg.message_text = $body.Value
+        }
+    }
+    return $Scenarios
+}
+
 function Merge-ScenariosById {
     param(
         [array]$Existing = @(),
@@ -1001,6 +1075,7 @@ function Import-ScenariosFromFile {
         $existingObj = Get-JsonObject -Path $TargetPath
         $existingList = @(Convert-ScenarioContainerToList -Container $existingObj)
         if ($null -eq $existingList) { $existingList = @() }
+        $existingList = @(Expand-ScenarioSideTables -ScenariosPath $TargetPath -Container $existingObj -Scenarios $existingList)
         $ext = [System.IO.Path]::GetExtension($dialog.FileName).ToLowerInvariant()
         if ($ext -eq ".csv") {
             $rows = Import-Csv -LiteralPath $dialog.FileName